@@ -4,13 +4,74 @@
 支持多行文本、图片OCR、表格等复杂情况
 """
 
+import atexit
+import logging
+import os
 import re
+import threading
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property, partial
 from typing import List, Dict, Any, Optional
 
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+# OCR相关依赖均为可选
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+# 页数少于该值时串行处理，避免进程池启动开销
+_PARALLEL_MIN_PAGES = 4
+# 纯文本与行级提取共用的TextPage标志位（不保留图像，与 get_text() 默认值相同）
+_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES if fitz is not None else 0
+# 构成一个表格区域所需的最少矩形数
+_TABLE_MIN_RECTS = 4
+# 比较前把连续空白折叠为单个空格
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 并行查找时复用的进程池，按进程数各创建一次、直到进程退出才关闭，
+# 不会关闭其他线程可能仍在提交任务的进程池
+_page_pools: Dict[int, ProcessPoolExecutor] = {}
+_page_pool_lock = threading.Lock()
+
+# 工作进程内最近处理的PDF文档及其图像OCR缓存，按 (路径, 修改时间, 大小) 识别
+_worker_doc_key = None
+_worker_doc = None
+_worker_ocr_cache = None
+
+# 每个线程常驻的tesserocr实例，语言数据只在首次识别时加载一次
+_tess_local = threading.local()
+
+# OCR依赖缺失的提示每个进程只输出一次，避免逐页重复
+_ocr_missing_warned = False
+
+
 def find_text_coordinates_advanced(text: str, pdf_path: str, 
                                    ignore_case: bool = False,
                                    multiline: bool = True,
-                                   with_ocr: bool = False) -> List[Dict[str, Any]]:
+                                   with_ocr: bool = False,
+                                   max_workers: Optional[int] = 1) -> List[Dict[str, Any]]:
     """
     在PDF中查找指定文字的坐标（增强版）
     
@@ -20,56 +81,202 @@ def find_text_coordinates_advanced(text: str, pdf_path: str,
         ignore_case (bool): 是否忽略大小写
         multiline (bool): 是否支持跨行搜索
         with_ocr (bool): 是否对图片进行OCR识别
+        max_workers (int): 并行处理页面的进程数，默认为1即串行处理，为None时使用CPU核数
     
     Returns:
         list: 包含坐标信息的列表
     """
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        try:
-            import fitz
-        except ImportError:
-            raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    if fitz is None:
+        raise ImportError("请安装PyMuPDF: pip install pymupdf")
     
     results = []
+    spec = _SearchSpec.create(text, ignore_case)
     doc = fitz.open(pdf_path)
+    page_count = doc.page_count
+    # 进程池大小只由 max_workers 决定，与页数无关，保证多次调用复用同一个进程池
+    workers = max_workers or os.cpu_count() or 1
+    
+    if workers <= 1 or page_count < _PARALLEL_MIN_PAGES:
+        ocr_cache = {}
+        for page_num in range(page_count):
+            results.extend(_search_page(doc[page_num], spec, page_num, multiline, with_ocr, ocr_cache))
+        doc.close()
+        return results
     
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        
-        # 1. 常规文本搜索
-        page_results = _search_regular_text(page, text, page_num, ignore_case, multiline)
+    doc.close()
+    
+    # 文件的修改时间和大小一并传给工作进程，文件被改写后工作进程会重新打开
+    st = os.stat(pdf_path)
+    doc_key = (os.path.abspath(pdf_path), st.st_mtime_ns, st.st_size)
+    
+    # 各页面相互独立，分发到进程池并行处理，按页码顺序合并结果
+    worker = partial(_process_page, doc_key=doc_key, spec=spec, multiline=multiline, with_ocr=with_ocr)
+    for page_results in _get_page_pool(workers).map(worker, range(page_count)):
         results.extend(page_results)
+    
+    return results
+
+
+def _get_page_pool(workers: int) -> ProcessPoolExecutor:
+    """获取模块级复用的进程池，相同进程数的查找共用同一组工作进程"""
+    with _page_pool_lock:
+        pool = _page_pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_page_worker)
+            _page_pools[workers] = pool
+        return pool
+
+
+@atexit.register
+def _shutdown_page_pools():
+    """进程退出时关闭所有进程池"""
+    with _page_pool_lock:
+        for pool in _page_pools.values():
+            pool.shutdown()
+        _page_pools.clear()
+
+
+def _init_page_worker():
+    """工作进程初始化"""
+    # 每个Tesseract进程保持单线程，由进程数提供并行度
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _process_page(page_num: int, doc_key: tuple, spec: "_SearchSpec",
+                  multiline: bool, with_ocr: bool) -> List[Dict[str, Any]]:
+    """工作进程任务：处理单个页面，同一文档在工作进程内只打开一次"""
+    global _worker_doc_key, _worker_doc, _worker_ocr_cache
+    
+    if doc_key != _worker_doc_key:
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = fitz.open(doc_key[0])
+        _worker_ocr_cache = {}
+        _worker_doc_key = doc_key
+    
+    return _search_page(_worker_doc[page_num], spec, page_num, multiline, with_ocr, _worker_ocr_cache)
+
+
+@dataclass(frozen=True)
+class _SearchSpec:
+    """
+    一次查找的目标文字及其派生形式
+    
+    在 find_text_coordinates_advanced 中只计算一次，
+    各页面、各搜索步骤共享，不再重复转换大小写
+    """
+    text: str
+    ignore_case: bool
+    search_text: str      # 参与子串比较的形式（忽略大小写时为小写）
+    normalized_text: str  # 空白折叠为单个空格后的 search_text
+    flags: int            # page.search_for 使用的标志位
+    
+    @classmethod
+    def create(cls, text: str, ignore_case: bool) -> "_SearchSpec":
+        search_text = text.lower() if ignore_case else text
+        return cls(
+            text=text,
+            ignore_case=ignore_case,
+            search_text=search_text,
+            normalized_text=_WHITESPACE_PATTERN.sub(' ', search_text),
+            flags=fitz.TEXT_INHIBIT_SPACES if ignore_case else 0,  # 忽略大小写时同时忽略空格差异
+        )
+    
+    def fold(self, value: str) -> str:
+        """把待比较文本转换为与 search_text 相同的大小写形式"""
+        return value.lower() if self.ignore_case else value
+
+
+class _PageContext:
+    """
+    单个页面的提取结果缓存
+    
+    各搜索步骤共享同一个上下文，保证每种MuPDF提取操作
+    在一次 find_text_coordinates_advanced 调用中对每页最多执行一次
+    """
+    
+    def __init__(self, page):
+        self.page = page
+        self._textpages = {}
+        self._search_results = {}
+    
+    def textpage(self, flags: int):
+        """按标志位缓存的TextPage，相同标志位的提取与搜索共用同一份"""
+        if flags not in self._textpages:
+            self._textpages[flags] = self.page.get_textpage(flags=flags)
+        return self._textpages[flags]
+    
+    @cached_property
+    def text_lines(self) -> List[Dict[str, Any]]:
+        """页面中所有非空文本行的文字与边界框"""
+        # 只需要行级文字和位置，不保留图像块以免提取图片二进制数据
+        text_dict = self.page.get_text("dict", textpage=self.textpage(_TEXT_FLAGS))
         
-        # 2. 表格文本搜索
-        table_results = _search_table_text(page, text, page_num, ignore_case)
-        results.extend(table_results)
-        
-        # 3. OCR图片文本搜索（如果启用）
-        if with_ocr:
-            ocr_results = _search_ocr_text(page, text, page_num, ignore_case)
-            results.extend(ocr_results)
+        lines = []
+        for block in text_dict["blocks"]:
+            if block.get("type") == 0:  # 文本块
+                for line in block["lines"]:
+                    line_text = "".join(span["text"] for span in line["spans"]).strip()
+                    if line_text:
+                        lines.append({"text": line_text, "bbox": line["bbox"]})
+        return lines
+    
+    @cached_property
+    def plain_text(self) -> str:
+        return self.page.get_text(textpage=self.textpage(_TEXT_FLAGS))
+    
+    @cached_property
+    def drawings(self) -> List[Dict[str, Any]]:
+        return self.page.get_drawings()
+    
+    @cached_property
+    def image_list(self) -> List[tuple]:
+        return self.page.get_images()
+    
+    def search(self, text: str, flags: int = 0) -> list:
+        """在整页中搜索文字，相同 (text, flags) 只搜索一次"""
+        key = (text, flags)
+        if key not in self._search_results:
+            self._search_results[key] = self.page.search_for(
+                text, quads=False, textpage=self.textpage(flags)
+            )
+        return self._search_results[key]
+    
+    def get_textbox(self, rect) -> str:
+        """提取矩形区域内的文字（与 page.get_textbox 一致使用默认标志位）"""
+        return self.page.get_textbox(rect, textpage=self.textpage(0))
+
+
+def _search_page(page, spec: _SearchSpec, page_num: int,
+                 multiline: bool, with_ocr: bool,
+                 ocr_cache: Optional[Dict[int, str]] = None) -> List[Dict[str, Any]]:
+    """在单个页面中执行所有搜索，ocr_cache 为同一文档内 xref -> OCR文本 的缓存"""
+    results = []
+    ctx = _PageContext(page)
+    
+    # 1. 常规文本搜索
+    page_results = _search_regular_text(ctx, spec, page_num, multiline)
+    results.extend(page_results)
+    
+    # 2. 表格文本搜索
+    table_results = _search_table_text(ctx, spec, page_num)
+    results.extend(table_results)
+    
+    # 3. OCR图片文本搜索（如果启用）
+    if with_ocr:
+        ocr_results = _search_ocr_text(ctx, spec, page_num, {} if ocr_cache is None else ocr_cache)
+        results.extend(ocr_results)
     
-    doc.close()
     return results
 
 
-def _search_regular_text(page, text: str, page_num: int, ignore_case: bool, multiline: bool) -> List[Dict[str, Any]]:
+def _search_regular_text(ctx: _PageContext, spec: _SearchSpec, page_num: int, multiline: bool) -> List[Dict[str, Any]]:
     """搜索常规文本"""
     results = []
-    
-    # 基础搜索
-    flags = 0
-    if ignore_case:
-        try:
-            import pymupdf as fitz
-            flags = fitz.TEXT_INHIBIT_SPACES  # 忽略空格差异
-        except:
-            pass
+    text = spec.text
     
     # 直接搜索
-    text_instances = page.search_for(text, flags=flags)
+    text_instances = ctx.search(text, spec.flags)
     for rect in text_instances:
         results.append({
             "page": page_num + 1,
@@ -81,102 +288,100 @@ def _search_regular_text(page, text: str, page_num: int, ignore_case: bool, mult
     
     # 如果启用多行搜索且没有直接找到
     if multiline and not text_instances:
-        multiline_results = _search_multiline_text(page, text, page_num, ignore_case)
+        multiline_results = _search_multiline_text(ctx, spec, page_num)
         results.extend(multiline_results)
     
     return results
 
 
-def _search_multiline_text(page, text: str, page_num: int, ignore_case: bool) -> List[Dict[str, Any]]:
-    """搜索跨行文本"""
-    results = []
+def _search_multiline_text(ctx: _PageContext, spec: _SearchSpec, page_num: int,
+                           max_span_ratio: float = 0.25,
+                           max_length_ratio: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    搜索跨行文本
     
-    # 获取页面的所有文本块
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        try:
-            import fitz
-        except ImportError:
+    max_span_ratio 限制匹配区域高度占页面高度的比例，超过时视为跨越了无关段落；
+    max_length_ratio 限制组合文本与目标文本的长度比，None 表示不限制
+    """
+    results = []
+    text = spec.text
+    search_text = spec.search_text
+    
+    # 先用整页纯文本快速排除不包含目标文本的页面，
+    # 行间换行与多余空白在比较前统一折叠为单个空格
+    page_text = spec.fold(ctx.plain_text)
+    if search_text not in page_text:
+        if spec.normalized_text not in _WHITESPACE_PATTERN.sub(' ', page_text):
             return results
     
-    # 获取文本块
-    text_dict = page.get_text("dict")
-    
-    # 提取所有文本和位置信息
-    text_segments = []
-    
-    for block in text_dict["blocks"]:
-        if block.get("type") == 0:  # 文本块
-            for line in block["lines"]:
-                line_text = ""
-                line_bbox = line["bbox"]
-                
-                for span in line["spans"]:
-                    line_text += span["text"]
-                
-                if line_text.strip():
-                    text_segments.append({
-                        "text": line_text.strip(),
-                        "bbox": line_bbox
-                    })
+    # 提取所有文本行和位置信息
+    text_segments = ctx.text_lines
     
     # 合并连续的文本段落进行搜索
-    search_text = text.lower() if ignore_case else text
-    
+    # 将所有行用空格连接成一个缓冲区并记录每行的起止偏移，
+    # 每个起始行只需一次 str.find 就能确定包含目标文本所需的最少行数
+    pieces = [spec.fold(seg["text"]) for seg in text_segments]
+    haystack = " ".join(pieces)
+    
+    line_ends = []
+    offset = 0
+    for piece in pieces:
+        offset += len(piece)
+        line_ends.append(offset)
+        offset += 1  # 行间空格
+    
+    max_span = max_span_ratio * ctx.page.rect.height
+    max_length = max_length_ratio * len(search_text) if max_length_ratio is not None else None
+    
+    pos = -1
     for i in range(len(text_segments)):
-        # 从当前位置开始，尝试组合多行文本
-        combined_text = ""
-        combined_bbox = None
+        line_start = line_ends[i] - len(pieces[i])
         
-        for j in range(i, min(i + 10, len(text_segments))):  # 最多检查10行
-            if combined_text:
-                combined_text += " " + text_segments[j]["text"]
-            else:
-                combined_text = text_segments[j]["text"]
-            
-            # 更新边界框
-            current_bbox = text_segments[j]["bbox"]
-            if combined_bbox is None:
-                combined_bbox = list(current_bbox)
-            else:
-                combined_bbox[0] = min(combined_bbox[0], current_bbox[0])  # x0
-                combined_bbox[1] = min(combined_bbox[1], current_bbox[1])  # y0
-                combined_bbox[2] = max(combined_bbox[2], current_bbox[2])  # x1
-                combined_bbox[3] = max(combined_bbox[3], current_bbox[3])  # y1
-            
-            # 检查是否包含目标文本
-            check_text = combined_text.lower() if ignore_case else combined_text
-            if search_text in check_text:
-                # 计算匹配度
-                confidence = len(search_text) / len(combined_text) if combined_text else 0
-                
-                results.append({
-                    "page": page_num + 1,
-                    "text": text,
-                    "bbox": combined_bbox,
-                    "found_text": combined_text,
-                    "type": "multiline_match",
-                    "confidence": min(confidence, 1.0),
-                    "lines_spanned": j - i + 1
-                })
+        # 上一次找到的位置仍在当前行之后时可以直接复用
+        if pos < line_start:
+            pos = haystack.find(search_text, line_start)
+            if pos < 0:
                 break
+        
+        # 目标文本结尾所在的行就是需要组合的最后一行
+        j = bisect_left(line_ends, pos + len(search_text))
+        if j - i >= 10:  # 最多检查10行
+            continue
+        
+        window = text_segments[i:j + 1]
+        combined_text = " ".join(seg["text"] for seg in window)
+        if max_length is not None and len(combined_text) > max_length:
+            continue
+        
+        # 计算合并后的边界框：转置后由内置 min/max 在C层完成逐坐标归约
+        x0s, y0s, x1s, y1s = zip(*(seg["bbox"] for seg in window))
+        combined_bbox = [min(x0s), min(y0s), max(x1s), max(y1s)]
+        if combined_bbox[3] - combined_bbox[1] > max_span:  # 跨度过大，视为跨越了无关段落
+            continue
+        
+        # 计算匹配度
+        confidence = len(search_text) / len(combined_text) if combined_text else 0
+        
+        results.append({
+            "page": page_num + 1,
+            "text": text,
+            "bbox": combined_bbox,
+            "found_text": combined_text,
+            "type": "multiline_match",
+            "confidence": min(confidence, 1.0),
+            "lines_spanned": j - i + 1
+        })
     
     return results
 
 
-def _search_table_text(page, text: str, page_num: int, ignore_case: bool) -> List[Dict[str, Any]]:
+def _search_table_text(ctx: _PageContext, spec: _SearchSpec, page_num: int) -> List[Dict[str, Any]]:
     """搜索表格中的文本"""
     results = []
-    
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        return results
+    text = spec.text
     
     # 检测表格（通过线条和矩形）
-    drawings = page.get_drawings()
-    tables = _detect_tables(page, drawings)
+    tables = _detect_tables(ctx.page, ctx.drawings)
     
     if not tables:
         return results
@@ -186,14 +391,11 @@ def _search_table_text(page, text: str, page_num: int, ignore_case: bool) -> Lis
         table_rect = fitz.Rect(table_area)
         
         # 获取表格区域内的文本
-        table_text = page.get_textbox(table_rect)
-        
-        search_text = text.lower() if ignore_case else text
-        check_text = table_text.lower() if ignore_case else table_text
+        table_text = ctx.get_textbox(table_rect)
         
-        if search_text in check_text:
-            # 尝试更精确地定位文本在表格中的位置
-            table_instances = page.search_for(text, clip=table_rect)
+        if spec.search_text in spec.fold(table_text):
+            # 尝试更精确地定位文本在表格中的位置（仅在表格区域内、使用默认标志位搜索）
+            table_instances = ctx.page.search_for(text, clip=table_rect)
             
             if table_instances:
                 for rect in table_instances:
@@ -221,118 +423,214 @@ def _search_table_text(page, text: str, page_num: int, ignore_case: bool) -> Lis
 
 def _detect_tables(page, drawings) -> List[List[float]]:
     """检测页面中的表格区域"""
-    try:
-        import pymupdf as fitz
-    except ImportError:
+    # 简单的表格检测：寻找矩形密集的区域
+    rects = [
+        drawing["rect"] for drawing in drawings
+        if drawing.get("type") == "re" and len(drawing.get("rect", [])) == 4  # 矩形
+    ]
+    
+    # 至少需要几个矩形才可能是表格
+    if len(rects) < _TABLE_MIN_RECTS:
         return []
     
-    # 简单的表格检测：寻找矩形密集的区域
-    rects = []
-    
-    for drawing in drawings:
-        if drawing.get("type") == "re":  # 矩形
-            rect = drawing.get("rect", [])
-            if len(rect) == 4:
-                rects.append(rect)
-    
-    # 合并相近的矩形来形成表格区域
-    if len(rects) > 3:  # 至少需要几个矩形才可能是表格
-        # 这里可以实现更复杂的表格检测算法
-        # 简化版本：返回包含最多矩形的区域
-        if rects:
-            min_x = min(rect[0] for rect in rects)
-            min_y = min(rect[1] for rect in rects)
-            max_x = max(rect[2] for rect in rects)
-            max_y = max(rect[3] for rect in rects)
-            
-            return [[min_x, min_y, max_x, max_y]]
+    # 按矩形中心聚类，每个足够密集的簇视为一个表格区域
+    eps = page.rect.height * 0.05
+    tables = []
+    for cluster in _cluster_rects(rects, eps):
+        if len(cluster) >= _TABLE_MIN_RECTS:
+            x0s, y0s, x1s, y1s = zip(*cluster)
+            tables.append([min(x0s), min(y0s), max(x1s), max(y1s)])
     
-    return []
+    return tables
+
+
+def _cluster_rects(rects: List, eps: float) -> List[List]:
+    """将中心距离不超过eps的矩形连通成簇（网格分桶 + 并查集）"""
+    parent = list(range(len(rects)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    centers = [((r[0] + r[2]) / 2, (r[1] + r[3]) / 2) for r in rects]
+    cell = eps or 1.0
+    grid = {}
+    for idx, (cx, cy) in enumerate(centers):
+        grid.setdefault((int(cx // cell), int(cy // cell)), []).append(idx)
+    
+    eps_sq = eps * eps
+    for (gx, gy), members in grid.items():
+        # 只需比较相邻网格中的矩形
+        neighbours = [
+            other
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+            for other in grid.get((gx + dx, gy + dy), ())
+        ]
+        for i in members:
+            cx, cy = centers[i]
+            for j in neighbours:
+                if j <= i:
+                    continue
+                ox, oy = centers[j]
+                if (cx - ox) ** 2 + (cy - oy) ** 2 <= eps_sq:
+                    parent[find(i)] = find(j)
+    
+    clusters = {}
+    for idx, rect in enumerate(rects):
+        clusters.setdefault(find(idx), []).append(rect)
+    return list(clusters.values())
 
 
-def _search_ocr_text(page, text: str, page_num: int, ignore_case: bool) -> List[Dict[str, Any]]:
+def _search_ocr_text(ctx: _PageContext, spec: _SearchSpec, page_num: int,
+                     ocr_cache: Dict[int, str]) -> List[Dict[str, Any]]:
     """对图片进行OCR并搜索文本"""
     results = []
+    text = spec.text
+    
+    # 获取页面中的图像，同一xref（重复引用的图像）只识别一次
+    unique_images = {}
+    for img_index, img in enumerate(ctx.image_list):
+        unique_images.setdefault(img[0], img_index)
+    
+    # 只识别文档中尚未识别过的图像（如每页重复出现的logo）
+    # 所有图像共享一次OCR初始化，Pixmap按需逐个生成、识别后立即释放
+    pending = [(img_index, xref) for xref, img_index in unique_images.items() if xref not in ocr_cache]
+    if pending:
+        ocr_texts = _perform_ocr_batch(_iter_pixmaps(ctx.page.parent, pending))
+        for (_, xref), ocr_text in zip(pending, ocr_texts):
+            ocr_cache[xref] = ocr_text
+    
+    for xref, img_index in unique_images.items():
+        ocr_text = ocr_cache.get(xref)
+        if not ocr_text:
+            continue
+        
+        if spec.search_text in spec.fold(ocr_text):
+            # 获取图像在页面中的位置
+            img_rect = ctx.page.get_image_rects(xref)
+            
+            if img_rect:
+                for rect in img_rect:
+                    results.append({
+                        "page": page_num + 1,
+                        "text": text,
+                        "bbox": [rect.x0, rect.y0, rect.x1, rect.y1],
+                        "found_text": ocr_text,
+                        "type": "ocr_match",
+                        "confidence": 0.8,
+                        "image_index": img_index
+                    })
     
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        return results
+    return results
+
+
+def _iter_pixmaps(doc, pending):
+    """依次生成待识别图像的Pixmap（CMYK转换为RGB），读取失败时生成None"""
+    for img_index, xref in pending:
+        try:
+            pix = fitz.Pixmap(doc, xref)
+            if pix.n - pix.alpha >= 4:  # CMYK无法直接识别，转换为RGB
+                pix = fitz.Pixmap(fitz.csRGB, pix)
+        except Exception:
+            logger.debug("OCR处理图像 %d 时出错", img_index, exc_info=True)
+            pix = None
+        
+        try:
+            yield pix
+        finally:
+            pix = None  # 识别完成后立即释放内存
+
+
+def _perform_ocr_batch(pixmaps) -> List[str]:
+    """
+    对一组图像执行OCR，所有图像共享一次Tesseract初始化
+    
+    优先使用tesserocr在进程内识别（常驻实例，语言数据只加载一次），
+    未安装时退回到pytesseract逐张识别
+    
+    Args:
+        pixmaps: PyMuPDF的Pixmap可迭代对象，元素为None表示该图像不可用
+    
+    Returns:
+        list: 与输入顺序一致的识别文本列表，识别失败的图像对应空字符串；
+              OCR依赖缺失或无法初始化时返回空列表
+    """
+    global _ocr_missing_warned
+    if Image is None or (tesserocr is None and pytesseract is None):
+        if not _ocr_missing_warned:
+            _ocr_missing_warned = True
+            logger.warning("OCR功能需要安装: pip install pytesseract pillow")
+        return []
     
-    # 获取页面中的图像
-    image_list = page.get_images()
+    texts = []
+    
+    # tesserocr不可用时不影响文本搜索，改用pytesseract或跳过OCR
+    api = _get_tess_api() if tesserocr is not None else None
+    if api is None and pytesseract is None:
+        return []
     
-    for img_index, img in enumerate(image_list):
+    if api is not None:
+        for pix in pixmaps:
+            texts.append("")
+            if pix is None:
+                continue
+            try:
+                if pix.n == 2:
+                    # Tesseract不接受灰度+透明通道的原始数据，走PIL转换
+                    api.SetImage(_pixmap_to_image(pix))
+                else:
+                    # 直接传入Pixmap的原始采样数据，无需经过PIL
+                    api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+                texts[-1] = api.GetUTF8Text().strip()
+            except Exception:
+                logger.debug("OCR处理失败", exc_info=True)
+        return texts
+    
+    for pix in pixmaps:
+        texts.append("")
+        if pix is None:
+            continue
         try:
-            # 获取图像
-            xref = img[0]
-            pix = fitz.Pixmap(page.parent, xref)
-            
-            if pix.n - pix.alpha < 4:  # 确保不是CMYK
-                # 进行OCR（需要安装pytesseract）
-                ocr_text = _perform_ocr(pix)
-                
-                if ocr_text:
-                    search_text = text.lower() if ignore_case else text
-                    check_text = ocr_text.lower() if ignore_case else ocr_text
-                    
-                    if search_text in check_text:
-                        # 获取图像在页面中的位置
-                        img_rect = page.get_image_rects(xref)
-                        
-                        if img_rect:
-                            for rect in img_rect:
-                                results.append({
-                                    "page": page_num + 1,
-                                    "text": text,
-                                    "bbox": [rect.x0, rect.y0, rect.x1, rect.y1],
-                                    "found_text": ocr_text,
-                                    "type": "ocr_match",
-                                    "confidence": 0.8,
-                                    "image_index": img_index
-                                })
-            
-            pix = None  # 释放内存
+            img = _pixmap_to_image(pix)
             
-        except Exception as e:
-            print(f"OCR处理图像 {img_index} 时出错: {e}")
-            continue
+            # 执行OCR
+            texts[-1] = pytesseract.image_to_string(img, lang='chi_sim+eng').strip()
+        except Exception:
+            logger.debug("OCR处理失败", exc_info=True)
     
-    return results
+    return texts
 
 
-def _perform_ocr(pix) -> str:
-    """对图像执行OCR"""
-    try:
-        import pytesseract
-        from PIL import Image
-        import io
-        
-        # 将PyMuPDF的Pixmap转换为PIL Image
-        img_data = pix.tobytes("ppm")
-        img = Image.open(io.BytesIO(img_data))
-        
-        # 执行OCR
-        ocr_text = pytesseract.image_to_string(img, lang='chi_sim+eng')
-        return ocr_text.strip()
-        
-    except ImportError:
-        print("OCR功能需要安装: pip install pytesseract pillow")
-        return ""
-    except Exception as e:
-        print(f"OCR处理失败: {e}")
-        return ""
+def _get_tess_api():
+    """
+    获取当前线程常驻的PyTessBaseAPI实例，首次调用时创建
+    
+    语言数据缺失或tessdata配置错误导致初始化失败时返回None，
+    并记录在线程局部变量中，之后的页面和调用不再重复尝试加载
+    """
+    api = getattr(_tess_local, "api", None)
+    if api is None:
+        try:
+            api = tesserocr.PyTessBaseAPI(lang='chi_sim+eng', psm=tesserocr.PSM.AUTO)
+        except Exception:
+            logger.debug("tesserocr初始化失败", exc_info=True)
+            api = False
+        _tess_local.api = api
+    return api or None
+
+
+def _pixmap_to_image(pix):
+    """直接用Pixmap的原始采样数据构造PIL Image，避免PPM编码再解码"""
+    mode = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}[pix.n]
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
 
 
 def find_text_with_regex(pattern: str, pdf_path: str) -> List[Dict[str, Any]]:
     """使用正则表达式搜索文本"""
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        try:
-            import fitz
-        except ImportError:
-            raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    if fitz is None:
+        raise ImportError("请安装PyMuPDF: pip install pymupdf")
     
     results = []
     doc = fitz.open(pdf_path)
@@ -345,12 +643,15 @@ def find_text_with_regex(pattern: str, pdf_path: str) -> List[Dict[str, Any]]:
         # 获取页面文本
         page_text = page.get_text()
         
-        # 查找所有匹配
-        matches = regex.finditer(page_text)
-        
-        for match in matches:
+        # 查找所有匹配，相同的匹配文本只定位一次
+        # （search_for 已返回该文本在页面中的全部位置）
+        unique_matches = {}
+        for match in regex.finditer(page_text):
             matched_text = match.group()
-            
+            if matched_text and matched_text not in unique_matches:
+                unique_matches[matched_text] = match
+        
+        for matched_text, match in unique_matches.items():
             # 搜索匹配文本的位置
             text_instances = page.search_for(matched_text)
             
@@ -371,9 +672,7 @@ def find_text_with_regex(pattern: str, pdf_path: str) -> List[Dict[str, Any]]:
 # 演示函数
 def demo_advanced():
     """演示增强功能"""
-    try:
-        import pymupdf as fitz
-    except ImportError:
+    if fitz is None:
         print("需要安装PyMuPDF来运行演示")
         return
     
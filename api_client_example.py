@@ -4,20 +4,51 @@ RAG切片定位API客户端使用示例
 演示如何调用FastAPI服务进行切片定位
 """
 
+import asyncio
+import os
 import requests
+import httpx
 import json
-from typing import Dict, Any
+import orjson
+from typing import Dict, Any, List, Tuple
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+from urllib3.util.retry import Retry
 
 class RAGChunkLocatorClient:
     """RAG切片定位API客户端"""
     
     def __init__(self, base_url: str = "http://localhost:8004"):
         self.base_url = base_url.rstrip('/')
+        self._health_url = f"{self.base_url}/health"
+        self._locate_url = f"{self.base_url}/locate"
+        self._analyze_url = f"{self.base_url}/analyze"
+        self._upload_url = f"{self.base_url}/upload"
+        
+        # 复用连接池，避免每次请求重新建立TCP连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """关闭底层会话"""
+        self.session.close()
         
     def check_health(self) -> Dict[str, Any]:
         """检查服务健康状态"""
         try:
-            response = requests.get(f"{self.base_url}/health")
+            response = self.session.get(self._health_url)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -43,16 +74,56 @@ class RAGChunkLocatorClient:
         }
         
         try:
-            response = requests.post(
-                f"{self.base_url}/locate",
-                json=data,
+            # 使用orjson序列化请求体并解析返回的嵌套结果
+            response = self.session.post(
+                self._locate_url,
+                data=orjson.dumps(data),
                 headers={"Content-Type": "application/json"}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return orjson.loads(response.content)
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
             return {"success": False, "message": f"请求失败: {e}"}
     
+    def locate_chunks(self, chunks: List[Tuple[str, str, float]],
+                      max_connections: int = 32) -> List[Dict[str, Any]]:
+        """
+        批量定位多个切片（并发发送请求）
+        
+        Args:
+            chunks: (切片内容, PDF文件路径, 相似度阈值) 列表
+            max_connections: 最大并发连接数
+            
+        Returns:
+            与输入顺序一致的定位结果列表
+        """
+        return asyncio.run(self.alocate_chunks(chunks, max_connections))
+    
+    async def alocate_chunks(self, chunks: List[Tuple[str, str, float]],
+                             max_connections: int = 32) -> List[Dict[str, Any]]:
+        """locate_chunks 的异步版本，可在已有事件循环中直接 await"""
+        limits = httpx.Limits(max_connections=max_connections)
+        
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=None) as client:
+            async def locate(chunk_text: str, pdf_path: str, similarity_threshold: float) -> Dict[str, Any]:
+                data = {
+                    "chunk_text": chunk_text,
+                    "pdf_path": pdf_path,
+                    "similarity_threshold": similarity_threshold
+                }
+                try:
+                    response = await client.post(
+                        "/locate",
+                        content=orjson.dumps(data),
+                        headers={"Content-Type": "application/json"}
+                    )
+                    response.raise_for_status()
+                    return orjson.loads(response.content)
+                except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+                    return {"success": False, "message": f"请求失败: {e}"}
+            
+            return await asyncio.gather(*(locate(*chunk) for chunk in chunks))
+    
     def analyze_chunk(self, chunk_text: str) -> Dict[str, Any]:
         """
         分析切片内容
@@ -66,8 +137,8 @@ class RAGChunkLocatorClient:
         data = {"chunk_text": chunk_text}
         
         try:
-            response = requests.post(
-                f"{self.base_url}/analyze",
+            response = self.session.post(
+                self._analyze_url,
                 data=data
             )
             response.raise_for_status()
@@ -90,16 +161,17 @@ class RAGChunkLocatorClient:
         """
         try:
             with open(pdf_file_path, 'rb') as pdf_file:
-                files = {'pdf_file': pdf_file}
-                data = {
+                # 流式编码multipart请求体，避免把整个PDF读入内存
+                encoder = MultipartEncoder(fields={
+                    'pdf_file': (os.path.basename(pdf_file_path), pdf_file, 'application/pdf'),
                     'chunk_text': chunk_text,
-                    'similarity_threshold': similarity_threshold
-                }
+                    'similarity_threshold': str(similarity_threshold)
+                })
                 
-                response = requests.post(
-                    f"{self.base_url}/upload",
-                    files=files,
-                    data=data
+                response = self.session.post(
+                    self._upload_url,
+                    data=encoder,
+                    headers={'Content-Type': encoder.content_type}
                 )
                 response.raise_for_status()
                 return response.json()
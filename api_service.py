@@ -4,26 +4,203 @@ RAG知识切片定位FastAPI服务
 提供API接口来定位RAG切片在PDF中的坐标位置
 """
 
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List
+import io
 import os
 import json
 import tempfile
-import shutil
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
 from pathlib import Path
 
-from rag_chunk_locator import find_rag_chunk_coordinates, analyze_chunk_content
+from rag_chunk_locator import (
+    find_rag_chunk_coordinates,
+    find_rag_chunk_coordinates_from_bytes,
+    analyze_chunk_content,
+    build_exact_line_index,
+    exact_line_key,
+)
 from mineru_locator import mineru_chunk_locate
 
+# 上传文件不超过该大小时完全保存在内存中，超过后转存到临时文件
+_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# 允许上传的PDF最大大小
+_MAX_UPLOAD_SIZE = 200 * 1024 * 1024
+# PDF文件头标识，规范允许其出现在文件开头1024字节内
+_PDF_MAGIC = b'%PDF-'
+_PDF_MAGIC_WINDOW = 1024
+# 复制上传内容时每次读取的块大小
+_COPY_CHUNK_SIZE = 1024 * 1024
+# 同时执行的定位任务上限，超出的请求在事件循环中排队等待
+_MAX_CONCURRENT_LOCATES = 16
+_locate_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_LOCATES)
+
+# 定位计算是CPU密集的纯Python代码，放到进程池中执行以免阻塞事件循环
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """服务启动时创建进程池，关闭时回收"""
+    global _executor
+    max_workers = int(os.environ.get("LOCATOR_POOL_WORKERS", 0)) or os.cpu_count()
+    _executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        yield
+    finally:
+        _executor.shutdown()
+        _executor = None
+
+
 # 创建FastAPI应用
+# 不设置自定义的 default_response_class：声明了 response_model 的接口由FastAPI
+# 直接通过pydantic-core序列化为JSON字节，换成ORJSONResponse反而会退回到先转dict再编码
 app = FastAPI(
     title="RAG切片定位服务",
     description="在PDF文档中精确定位RAG知识切片的坐标位置",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=_lifespan
 )
 
+
+async def _run_in_executor(func, **kwargs):
+    """在进程池中执行定位函数（进程池未启动时退回默认线程池）"""
+    loop = asyncio.get_running_loop()
+    async with _locate_semaphore:
+        return await loop.run_in_executor(_executor, partial(func, **kwargs))
+
+
+@lru_cache(maxsize=32)
+def _load_exact_line_index(pdf_path: str, mtime_ns: int):
+    """按 (路径, 修改时间) 缓存PDF的逐行精确匹配索引"""
+    return build_exact_line_index(pdf_path)
+
+
+def _locate_with_exact_index(chunk_text: str, pdf_path: str, similarity_threshold: float,
+                             return_best_only: bool = True):
+    """相似度阈值为1时先查精确匹配索引，未命中再执行完整的定位流程"""
+    if similarity_threshold >= 0.999:
+        mtime_ns = os.stat(pdf_path).st_mtime_ns
+        hit = _load_exact_line_index(pdf_path, mtime_ns).get(exact_line_key(chunk_text))
+        if hit is not None:
+            page, bbox, line_text = hit
+            return [{
+                "page": page,
+                "bbox": bbox,
+                "type": "exact_line_match",
+                "found_text": line_text,
+                "similarity": 1.0,
+                "match_type": "精确匹配"
+            }]
+    
+    return find_rag_chunk_coordinates(
+        chunk_text=chunk_text,
+        pdf_path=pdf_path,
+        similarity_threshold=similarity_threshold,
+        return_best_only=return_best_only
+    )
+
+
+async def _spool_upload(upload: UploadFile):
+    """
+    分块读取上传的文件：较小的文件保留在内存中，较大的文件转存到临时文件
+    
+    读取与磁盘写入都不在事件循环线程中执行，每块之间让出控制权
+    
+    Returns:
+        (文件内容, 临时文件路径)，两者只有一个不为None
+    """
+    buffer = io.BytesIO()
+    temp_file = None
+    size = 0
+    
+    try:
+        while True:
+            chunk = await upload.read(_COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            
+            # 第一块就检查文件头，不是PDF的上传不再继续复制
+            if size == 0 and _PDF_MAGIC not in chunk[:_PDF_MAGIC_WINDOW]:
+                raise HTTPException(
+                    status_code=400,
+                    detail="上传的文件不是有效的PDF"
+                )
+            
+            size += len(chunk)
+            if size > _MAX_UPLOAD_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"上传文件过大，最大支持 {_MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
+                )
+            
+            if temp_file is None and size > _SPOOL_MAX_SIZE:
+                # 超过内存阈值，把已读取的内容转存到临时文件
+                temp_file = await run_in_threadpool(
+                    tempfile.NamedTemporaryFile, delete=False, suffix='.pdf'
+                )
+                await run_in_threadpool(temp_file.write, buffer.getvalue())
+                buffer = None
+            
+            if temp_file is None:
+                buffer.write(chunk)
+            else:
+                await run_in_threadpool(temp_file.write, chunk)
+    except BaseException:
+        if temp_file is not None:
+            temp_file.close()
+            os.unlink(temp_file.name)
+        raise
+    
+    if size == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="上传的文件为空"
+        )
+    
+    if temp_file is None:
+        return buffer.getvalue(), None
+    
+    temp_file.close()
+    return None, temp_file.name
+
+
+@app.middleware("http")
+async def _reject_oversized_upload(request: Request, call_next):
+    """在解析请求体之前按 Content-Length 拒绝过大的上传"""
+    if request.url.path == "/upload":
+        try:
+            content_length = int(request.headers.get("content-length", 0))
+        except ValueError:
+            content_length = 0
+        if content_length > _MAX_UPLOAD_SIZE:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"上传文件过大，最大支持 {_MAX_UPLOAD_SIZE // (1024 * 1024)}MB"}
+            )
+    return await call_next(request)
+
+
+def _preview(text: str, limit: int = 200) -> str:
+    """截取文本预览，超出长度时以省略号结尾"""
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+
+def _remove_temp_file(path: str):
+    """删除临时文件（文件已不存在时忽略）"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
 # 添加CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +211,10 @@ app.add_middleware(
 )
 
 
+# 文件名中需要移除的路径分隔符
+_PATH_SEPARATORS = str.maketrans('', '', '/\\')
+
+
 # 请求模型
 class ChunkLocationRequest(BaseModel):
     """切片定位请求模型"""
@@ -41,15 +222,17 @@ class ChunkLocationRequest(BaseModel):
     pdf_path: str = Field(..., description="PDF文件路径")
     similarity_threshold: Optional[float] = Field(0.5, ge=0.0, le=1.0, description="相似度阈值(0-1)")
     
-    @validator('chunk_text')
-    def validate_chunk_text(cls, v):
+    @field_validator('chunk_text')
+    @classmethod
+    def validate_chunk_text(cls, v: str) -> str:
         if not v.strip():
             raise ValueError('切片内容不能为空')
         return v.strip()
     
-    @validator('pdf_path')
-    def validate_pdf_path(cls, v):
-        if not v.endswith('.pdf'):
+    @field_validator('pdf_path')
+    @classmethod
+    def validate_pdf_path(cls, v: str) -> str:
+        if os.path.splitext(v)[1].lower() != '.pdf':
             raise ValueError('必须是PDF文件')
         return v
 
@@ -57,6 +240,8 @@ class ChunkLocationRequest(BaseModel):
 # 响应模型
 class ChunkLocationResponse(BaseModel):
     """切片定位响应模型"""
+    model_config = ConfigDict(frozen=True)
+    
     success: bool = Field(..., description="是否成功定位")
     page: Optional[int] = Field(None, description="页码")
     bbox: Optional[List[float]] = Field(None, description="坐标边界框 [x0, y0, x1, y1]")
@@ -68,6 +253,8 @@ class ChunkLocationResponse(BaseModel):
 
 class ChunkAnalysisResponse(BaseModel):
     """切片分析响应模型"""
+    model_config = ConfigDict(frozen=True)
+    
     length: int = Field(..., description="文本长度")
     sentences: int = Field(..., description="句子数量")
     has_numbers: bool = Field(..., description="是否包含数字")
@@ -81,22 +268,25 @@ class MineruChunkRequest(BaseModel):
     similarity_threshold: Optional[float] = Field(0.6, ge=0.0, le=1.0, description="相似度阈值(0-1)")
     page_number: Optional[int] = Field(None, ge=0, description="起始页面索引（从0开始），如果不指定则从第0页开始搜索")
     
-    @validator('filename')
-    def validate_filename(cls, v):
-        if not v.strip():
+    @field_validator('filename')
+    @classmethod
+    def validate_filename(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
             raise ValueError('文件名不能为空')
         # 移除可能的路径分隔符，确保安全
-        v = v.replace('/', '').replace('\\', '').replace('..', '')
-        return v.strip()
+        return v.translate(_PATH_SEPARATORS).replace('..', '').strip()
     
-    @validator('text')
-    def validate_text(cls, v):
+    @field_validator('text')
+    @classmethod
+    def validate_text(cls, v: str) -> str:
         if not v.strip():
             raise ValueError('文本内容不能为空')
         return v.strip()
     
-    @validator('page_number')
-    def validate_page_number(cls, v):
+    @field_validator('page_number')
+    @classmethod
+    def validate_page_number(cls, v: Optional[int]) -> Optional[int]:
         if v is not None and v < 0:
             raise ValueError('页面索引不能为负数')
         return v
@@ -104,6 +294,8 @@ class MineruChunkRequest(BaseModel):
 
 class BlockDetail(BaseModel):
     """文本块详细信息"""
+    model_config = ConfigDict(frozen=True)
+    
     bbox: List[float] = Field(..., description="文本块边界框")
     bbox_fs: Optional[List[float]] = Field(None, description="更精确的边界框")
     index: int = Field(..., description="文本块索引")
@@ -111,6 +303,8 @@ class BlockDetail(BaseModel):
 
 class MineruMatchResult(BaseModel):
     """单个匹配结果"""
+    model_config = ConfigDict(frozen=True)
+    
     page_idx: int = Field(..., description="页面索引（从0开始）")
     page_size: List[int] = Field(..., description="页面尺寸 [width, height]")
     bbox: List[float] = Field(..., description="合并后的边界框 [x0, y0, x1, y1]")
@@ -122,6 +316,8 @@ class MineruMatchResult(BaseModel):
 
 class MineruChunkResponse(BaseModel):
     """MinerU文本定位响应模型"""
+    model_config = ConfigDict(frozen=True)
+    
     success: bool = Field(..., description="是否成功定位")
     message: str = Field(..., description="响应消息")
     query_text: Optional[str] = Field(None, description="查询文本")
@@ -174,7 +370,8 @@ async def locate_chunk(request: ChunkLocationRequest):
             )
         
         # 调用核心定位功能，只返回最佳匹配
-        results = find_rag_chunk_coordinates(
+        results = await _run_in_executor(
+            _locate_with_exact_index,
             chunk_text=request.chunk_text,
             pdf_path=request.pdf_path,
             similarity_threshold=request.similarity_threshold,
@@ -185,17 +382,13 @@ async def locate_chunk(request: ChunkLocationRequest):
             # 获取最佳匹配结果
             best_result = results[0]
             
-            # 提取文本预览
-            found_text = best_result.get('found_text', '')
-            preview = found_text[:200] + "..." if len(found_text) > 200 else found_text
-            
             return ChunkLocationResponse(
                 success=True,
                 page=best_result['page'],
                 bbox=best_result['bbox'],
                 similarity=round(best_result['similarity'], 3),
                 match_type=best_result.get('match_type', 'unknown'),
-                found_text_preview=preview,
+                found_text_preview=_preview(best_result.get('found_text', '')),
                 message=f"成功定位到第{best_result['page']}页"
             )
         else:
@@ -253,6 +446,7 @@ async def analyze_chunk(chunk_text: str = Form(..., description="要分析的切
 
 @app.post("/upload", response_model=ChunkLocationResponse)
 async def upload_and_locate(
+    background_tasks: BackgroundTasks,
     chunk_text: str = Form(..., description="RAG知识切片内容"),
     similarity_threshold: float = Form(0.5, description="相似度阈值"),
     pdf_file: UploadFile = File(..., description="PDF文件")
@@ -290,34 +484,44 @@ async def upload_and_locate(
                 detail="相似度阈值必须在0-1之间"
             )
         
-        # 创建临时文件保存上传的PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            shutil.copyfileobj(pdf_file.file, temp_file)
-            temp_pdf_path = temp_file.name
+        # 保存上传的PDF：小文件直接在内存中定位，大文件写入临时文件
+        pdf_bytes, temp_pdf_path = await _spool_upload(pdf_file)
+        
+        if temp_pdf_path is not None:
+            # 响应发送后再删除临时文件，不占用请求耗时
+            background_tasks.add_task(_remove_temp_file, temp_pdf_path)
         
         try:
             # 调用定位功能
-            results = find_rag_chunk_coordinates(
-                chunk_text=chunk_text.strip(),
-                pdf_path=temp_pdf_path,
-                similarity_threshold=similarity_threshold,
-                return_best_only=True
-            )
+            if temp_pdf_path is None:
+                results = await _run_in_executor(
+                    find_rag_chunk_coordinates_from_bytes,
+                    chunk_text=chunk_text.strip(),
+                    pdf_bytes=pdf_bytes,
+                    similarity_threshold=similarity_threshold,
+                    return_best_only=True
+                )
+            else:
+                results = await _run_in_executor(
+                    find_rag_chunk_coordinates,
+                    chunk_text=chunk_text.strip(),
+                    pdf_path=temp_pdf_path,
+                    similarity_threshold=similarity_threshold,
+                    return_best_only=True,
+                    # 临时文件在响应后删除，不放入工作进程的文档池
+                    cache_document=False
+                )
             
             if results and len(results) > 0:
                 best_result = results[0]
                 
-                # 提取文本预览
-                found_text = best_result.get('found_text', '')
-                preview = found_text[:200] + "..." if len(found_text) > 200 else found_text
-                
                 return ChunkLocationResponse(
                     success=True,
                     page=best_result['page'],
                     bbox=best_result['bbox'],
                     similarity=round(best_result['similarity'], 3),
                     match_type=best_result.get('match_type', 'unknown'),
-                    found_text_preview=preview,
+                    found_text_preview=_preview(best_result.get('found_text', '')),
                     message=f"成功定位到第{best_result['page']}页"
                 )
             else:
@@ -326,11 +530,14 @@ async def upload_and_locate(
                     message="未找到匹配的位置，建议降低相似度阈值或检查切片内容"
                 )
                 
-        finally:
-            # 清理临时文件
-            if os.path.exists(temp_pdf_path):
-                os.unlink(temp_pdf_path)
+        except BaseException:
+            # 出错时后台任务不会执行，直接清理临时文件
+            if temp_pdf_path is not None:
+                _remove_temp_file(temp_pdf_path)
+            raise
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -351,54 +558,18 @@ async def mineru_locate_chunk(request: MineruChunkRequest):
         MineruChunkResponse: 定位结果
     """
     try:
-        # 调用核心定位功能
-        result = mineru_chunk_locate(
+        # 调用核心定位功能（解析后的middle.json缓存在执行该任务的工作进程中）
+        result = await _run_in_executor(
+            mineru_chunk_locate,
             filename=request.filename,
             text=request.text,
             similarity_threshold=request.similarity_threshold,
             page_number=request.page_number
         )
         
-        # 转换结果格式
-        if result['success']:
-            # 转换匹配结果
-            match_results = []
-            for match in result['results']:
-                block_details = []
-                for detail in match['block_details']:
-                    block_details.append(BlockDetail(
-                        bbox=detail['bbox'],
-                        bbox_fs=detail.get('bbox_fs'),
-                        index=detail['index']
-                    ))
-                
-                match_results.append(MineruMatchResult(
-                    page_idx=match['page_idx'],
-                    page_size=match['page_size'],
-                    bbox=match['bbox'],
-                    similarity=match['similarity'],
-                    block_count=match['block_count'],
-                    matched_text_preview=match['matched_text_preview'],
-                    block_details=block_details
-                ))
-            
-            return MineruChunkResponse(
-                success=True,
-                message=result['message'],
-                query_text=result.get('query_text'),
-                cleaned_text=result.get('cleaned_text'),
-                similarity_threshold=result.get('similarity_threshold'),
-                results=match_results
-            )
-        else:
-            return MineruChunkResponse(
-                success=False,
-                message=result['message'],
-                query_text=result.get('query_text'),
-                cleaned_text=result.get('cleaned_text'),
-                similarity_threshold=result.get('similarity_threshold'),
-                results=[]
-            )
+        # 定位结果的字典结构与 MineruChunkResponse 一致，直接返回，
+        # 由FastAPI依据 response_model 一次完成校验和序列化，无需逐块重建模型
+        return result
             
     except FileNotFoundError:
         raise HTTPException(
@@ -443,7 +614,7 @@ async def get_api_docs():
 if __name__ == "__main__":
     import uvicorn
     
-    # 启动开发服务器
+    # 启动开发服务器（生产环境请使用 start_api.py）
     uvicorn.run(
         "api_service:app",
         host="0.0.0.0",
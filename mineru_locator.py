@@ -7,10 +7,33 @@ MinerU格式文本坐标定位器
 import re
 import json
 import os
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
 from difflib import SequenceMatcher
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 
+# orjson解析大型middle.json明显快于标准库，未安装时退回json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# RapidFuzz的Indel相似度（基于最长公共子序列）由C++实现，用作SequenceMatcher的相似度上界
+try:
+    from rapidfuzz.distance import Indel
+except ImportError:
+    Indel = None
+
+# clean_text_for_matching 使用的正则，模块加载时编译一次
+_IMAGE_URL_PATTERN = re.compile(
+    r'https?://[^\s]*\.(jpg|jpeg|png|gif|bmp|webp|svg|tiff?|ico)(\?[^\s]*)?#', re.IGNORECASE
+)
+# 保留字符集中不含空白，移除特殊符号的同时去掉全部空白
+_DISALLOWED_CHAR_PATTERN = re.compile(r'[^\w\u4e00-\u9fff.,!?;:()\[\]{}""\'\'-]')
+
 
 def clean_text_for_matching(text: str) -> str:
     """
@@ -22,29 +45,23 @@ def clean_text_for_matching(text: str) -> str:
     Returns:
         清洗后的文本
     """
-    # 移除多余的空白字符和换行符
-    text = re.sub(r'\s+', ' ', text)
-    
-    # 移除图片URL（包括http和https协议的图片链接）
-    image_url_pattern = r'https?://[^\s]*\.(jpg|jpeg|png|gif|bmp|webp|svg|tiff?|ico)(\?[^\s]*)?#'
-    text = re.sub(image_url_pattern, '', text, flags=re.IGNORECASE)
-    
-    # 移除特殊符号，保留中英文、数字和基本标点
-    text = re.sub(r'[^\w\s\u4e00-\u9fff.,!?;:()\[\]{}""\'\'-]', '', text)
-    
-    # 移除多余空格
-    text = re.sub(r'\s+', '', text)
+    # 移除图片URL（包括http和https协议的图片链接），不含 "://" 的文本无需匹配
+    if '://' in text:
+        text = _IMAGE_URL_PATTERN.sub('', text)
     
-    return text.strip()
+    # 移除特殊符号和所有空白，保留中英文、数字和基本标点
+    # 结果中已不含空白，无需再strip
+    return _DISALLOWED_CHAR_PATTERN.sub('', text)
 
 
-def calculate_text_similarity(text1: str, text2: str) -> float:
+def calculate_text_similarity(text1: str, text2: str, score_cutoff: float = 0.0) -> float:
     """
     计算两个文本的相似度
     
     Args:
         text1: 文本1
         text2: 文本2
+        score_cutoff: 相似度下限，可以确定达不到该值时不做完整计算，直接返回0
         
     Returns:
         相似度分数(0-1)
@@ -56,32 +73,89 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
     clean_text1 = clean_text_for_matching(text1)
     clean_text2 = clean_text_for_matching(text2)
     
+    return _raw_similarity(clean_text1, clean_text2, score_cutoff)
+
+
+def _raw_similarity(clean_text1: str, clean_text2: str, score_cutoff: float = 0.0) -> float:
+    """计算两个已清洗文本的相似度（清洗结果再次清洗不变，调用方已清洗时跳过清洗）"""
     if not clean_text1 or not clean_text2:
         return 0.0
     
+    # 完全相同的文本无需匹配
+    if clean_text1 == clean_text2:
+        return 1.0
+    
+    # 相似度上界低于下限的文本无需执行完整的序列匹配
+    if score_cutoff > 0 and not _may_reach_cutoff(clean_text1, clean_text2, score_cutoff):
+        return 0.0
+    
     # 使用SequenceMatcher计算相似度
-    similarity = SequenceMatcher(None, clean_text1, clean_text2).ratio()
+    return SequenceMatcher(None, clean_text1, clean_text2).ratio()
+
+
+def _may_reach_cutoff(text1: str, text2: str, score_cutoff: float) -> bool:
+    """判断SequenceMatcher.ratio()是否可能达到 score_cutoff（按相似度上界判断，不会误判）"""
+    # 留出微小余量，避免浮点误差把恰好达到下限的文本排除
+    score_cutoff = max(score_cutoff - 1e-9, 0.0)
+    
+    # 长度差距给出的上界：匹配字符数不超过较短文本的长度
+    len1, len2 = len(text1), len(text2)
+    if 2.0 * min(len1, len2) / (len1 + len2) < score_cutoff:
+        return False
+    
+    if Indel is not None:
+        # 匹配块组成的公共子序列不会长于最长公共子序列，Indel相似度即为上界。
+        # 相似度达到下限等价于Indel距离不超过 max_distance，按整数距离设置上限
+        # （归一化的 score_cutoff 在边界处会误判），超出上限后立即结束计算
+        max_distance = int((len1 + len2) * (1.0 - score_cutoff))
+        return Indel.distance(text1, text2, score_cutoff=max_distance) <= max_distance
+    return SequenceMatcher(None, text1, text2).quick_ratio() >= score_cutoff
+
+
+def get_middle_json_path(filename: str) -> Path:
+    """
+    获取文件名对应的middle.json路径
     
-    return similarity
+    Args:
+        filename: 文件名（不含扩展名）
+        
+    Returns:
+        middle.json文件路径
+    """
+    data_dir = Path("./data")
+    return data_dir / f"{filename}_middle.json"
 
 
 def load_middle_json(filename: str) -> Optional[Dict]:
     """
     加载指定的middle.json文件
     
+    解析结果按 (文件路径, 修改时间) 缓存，文件更新后自动重新解析；
+    返回的数据在多次调用间共享，调用方不应修改
+    
     Args:
         filename: 文件名（不含扩展名）
         
     Returns:
         JSON数据或None
     """
-    data_dir = Path("./data")
-    json_path = data_dir / f"{filename}_middle.json"
+    json_path = get_middle_json_path(filename)
     
-    if not json_path.exists():
+    try:
+        mtime_ns = json_path.stat().st_mtime_ns
+    except OSError:
         return None
     
+    return _load_middle_json_cached(os.path.abspath(json_path), mtime_ns)
+
+
+@lru_cache(maxsize=32)
+def _load_middle_json_cached(json_path: str, mtime_ns: int) -> Optional[Dict]:
+    """解析middle.json文件，mtime_ns 仅作为缓存键的一部分"""
     try:
+        if orjson is not None:
+            with open(json_path, 'rb') as f:
+                return orjson.loads(f.read())
         with open(json_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except Exception as e:
@@ -102,21 +176,78 @@ def extract_text_from_para_block(para_block: Dict) -> str:
     if para_block.get('type') != 'text':
         return ""
     
-    text_parts = []
-    lines = para_block.get('lines', [])
-    
-    for line in lines:
-        spans = line.get('spans', [])
-        for span in spans:
-            content = span.get('content', '')
-            if content:
-                text_parts.append(content)
+    return ''.join([
+        span.get('content') or ''
+        for line in para_block.get('lines', ())
+        for span in line.get('spans', ())
+    ])
+
+
+def get_cleaned_block_texts(para_blocks: List[Dict]) -> List[Optional[str]]:
+    """
+    提取并清洗每个文本块的文本，供连续块匹配重复使用
     
-    return ''.join(text_parts)
+    Args:
+        para_blocks: 文本块列表
+        
+    Returns:
+        与para_blocks一一对应的清洗后文本，非文本块或无文本的块为None
+    """
+    cleaned_texts = []
+    for block in para_blocks:
+        block_text = extract_text_from_para_block(block)
+        cleaned_texts.append(clean_text_for_matching(block_text) if block_text else None)
+    return cleaned_texts
+
+
+class _PageBlocks(NamedTuple):
+    """页面中文本块的预处理结果，各列表与 text_blocks 一一对应"""
+    text_blocks: List[Dict]
+    block_texts: List[str]
+    cleaned_texts: List[Optional[str]]  # 无文本的块为None
+    char_sets: List[Optional[frozenset]]  # 清洗后文本包含的字符集合
+
+
+# 页面预处理结果的缓存（LRU），以页面对象的id为键，同时保存页面对象本身以确认id未被复用；
+# 页面数据在首次定位后不应再被修改
+_PAGE_CACHE_SIZE = 4096
+_page_blocks_cache: "OrderedDict[int, Tuple[Dict, _PageBlocks]]" = OrderedDict()
+_page_blocks_lock = threading.Lock()
+
+
+def _prepare_page_blocks(para_blocks: List[Dict]) -> _PageBlocks:
+    """筛选页面中的文本块并提取、清洗其文本"""
+    text_blocks = [block for block in para_blocks if block.get('type') == 'text']
+    block_texts = [extract_text_from_para_block(block) for block in text_blocks]
+    cleaned_texts = [clean_text_for_matching(block_text) if block_text else None
+                     for block_text in block_texts]
+    char_sets = [frozenset(block_clean) if block_clean is not None else None
+                 for block_clean in cleaned_texts]
+    return _PageBlocks(text_blocks, block_texts, cleaned_texts, char_sets)
+
+
+def _get_page_blocks(page_info: Dict) -> _PageBlocks:
+    """取出页面的预处理结果，同一页面在多次查询之间只预处理一次"""
+    key = id(page_info)
+    with _page_blocks_lock:
+        entry = _page_blocks_cache.get(key)
+        if entry is not None and entry[0] is page_info:
+            _page_blocks_cache.move_to_end(key)
+            return entry[1]
+    
+    page_blocks = _prepare_page_blocks(page_info.get('para_blocks', []))
+    
+    with _page_blocks_lock:
+        _page_blocks_cache[key] = (page_info, page_blocks)
+        _page_blocks_cache.move_to_end(key)
+        if len(_page_blocks_cache) > _PAGE_CACHE_SIZE:
+            _page_blocks_cache.popitem(last=False)
+    return page_blocks
 
 
 def find_continuous_blocks(para_blocks: List[Dict], start_idx: int, target_text: str, 
-                          similarity_threshold: float = 0.6) -> Tuple[List[Dict], float]:
+                          similarity_threshold: float = 0.6,
+                          cleaned_texts: Optional[List[Optional[str]]] = None) -> Tuple[List[Dict], float]:
     """
     从指定位置开始查找连续的匹配文本块
     
@@ -125,6 +256,8 @@ def find_continuous_blocks(para_blocks: List[Dict], start_idx: int, target_text:
         start_idx: 开始索引
         target_text: 目标文本
         similarity_threshold: 相似度阈值
+        cleaned_texts: 与para_blocks一一对应的清洗后文本（无文本的块为None），
+            为None时逐块提取并清洗
         
     Returns:
         (匹配的连续文本块列表, 总体相似度分数)
@@ -132,40 +265,143 @@ def find_continuous_blocks(para_blocks: List[Dict], start_idx: int, target_text:
     if start_idx >= len(para_blocks):
         return [], 0.0
     
-    matched_blocks = []
-    combined_text = ""
     target_clean = clean_text_for_matching(target_text)
     
+    if cleaned_texts is None:
+        cleaned_texts = get_cleaned_block_texts(para_blocks)
+    
+    matched_indices, similarity = _match_continuous_blocks(
+        cleaned_texts, start_idx, target_clean, similarity_threshold
+    )
+    return [para_blocks[i] for i in matched_indices], similarity
+
+
+def _match_continuous_blocks(cleaned_texts: List[Optional[str]], start_idx: int, target_clean: str,
+                             similarity_threshold: float) -> Tuple[List[int], float]:
+    """find_continuous_blocks 的实现，基于清洗后的文本返回匹配块的索引"""
+    matched_indices = []
+    combined_text = ""
+    combined_similarity = 0.0  # combined_text 的相似度，加入时已精确计算过
+    
     # 从start_idx开始，尝试连续匹配
-    for i in range(start_idx, len(para_blocks)):
-        block = para_blocks[i]
-        if block.get('type') != 'text':
-            continue
-        
-        block_text = extract_text_from_para_block(block)
-        if not block_text:
+    for i in range(start_idx, len(cleaned_texts)):
+        block_clean = cleaned_texts[i]
+        if block_clean is None:
             continue
         
         # 将当前块加入候选
-        test_combined = combined_text + clean_text_for_matching(block_text)
-        test_similarity = calculate_text_similarity(target_clean, test_combined)
+        test_combined = combined_text + block_clean
+        if matched_indices and not block_clean:
+            # 清洗后为空的块不改变拼接文本，沿用已有的相似度
+            test_similarity = combined_similarity
+        else:
+            # 只需判断相似度能否达到加入条件，达不到时不必算出精确值
+            cutoff = min(similarity_threshold, 0.3) if matched_indices else similarity_threshold
+            test_similarity = _raw_similarity(target_clean, test_combined, score_cutoff=cutoff)
         
         # 如果加入当前块后相似度提高，则加入
-        if test_similarity > similarity_threshold or (matched_blocks and test_similarity >= 0.3):
-            matched_blocks.append(block)
+        if test_similarity > similarity_threshold or (matched_indices and test_similarity >= 0.3):
+            matched_indices.append(i)
             combined_text = test_combined
+            combined_similarity = test_similarity
         else:
             # 如果相似度太低且已有匹配块，则停止
-            if matched_blocks:
+            if matched_indices:
                 break
     
-    # 计算最终相似度
-    final_similarity = calculate_text_similarity(target_clean, combined_text) if combined_text else 0.0
+    # 最终相似度即最后一次加入块时的相似度，无需重新计算
+    return matched_indices, combined_similarity
+
+
+def _find_first_matchable_blocks(cleaned_texts: List[Optional[str]], target_clean: str,
+                                 similarity_threshold: float) -> List[Optional[int]]:
+    """对每个位置求其后（含自身）第一个能作为连续匹配首块的文本块索引，不存在时为None"""
+    first_matchable = [None] * len(cleaned_texts)
+    next_idx = None
+    for i in range(len(cleaned_texts) - 1, -1, -1):
+        block_clean = cleaned_texts[i]
+        # 与 find_continuous_blocks 中首块的加入条件一致
+        if block_clean is not None and _raw_similarity(
+                target_clean, block_clean, score_cutoff=similarity_threshold) > similarity_threshold:
+            next_idx = i
+        first_matchable[i] = next_idx
+    return first_matchable
+
+
+def _build_match_result(page_idx: int, page_size: List, text_blocks: List[Dict], block_texts: List[str],
+                        matched_indices: List[int], similarity: float) -> Dict[str, Any]:
+    """根据匹配块的索引生成一条匹配结果"""
+    matched_blocks = [text_blocks[i] for i in matched_indices]
+    
+    # 提取匹配的文本预览（join对列表只需遍历一次，比生成器表达式更快）
+    matched_text = ''.join([block_texts[i] for i in matched_indices])
+    
+    return {
+        "page_idx": page_idx,
+        "page_size": page_size,
+        "bbox": calculate_combined_bbox(matched_blocks),  # 合并后的边界框
+        "similarity": round(similarity, 3),
+        "block_count": len(matched_blocks),
+        "matched_text_preview": matched_text if len(matched_text) <= 200 else f"{matched_text[:200]}...",
+        "block_details": [
+            {
+                "bbox": block.get('bbox', []),
+                "bbox_fs": block.get('bbox_fs', []),
+                "index": int(block.get('index', 0))  # 确保index是整数
+            }
+            for block in matched_blocks
+        ]
+    }
+
+
+def _scan_page(page_idx: int, page_info: Dict, cleaned_text: str, similarity_threshold: float,
+               key_char_set: Optional[frozenset]) -> List[Dict[str, Any]]:
+    """在单个页面中查找与目标文本连续匹配的文本块，返回该页的全部匹配结果（可能重复）"""
+    page_size = page_info.get('page_size', [0, 0])
+    
+    # type为text的块及其提取、清洗后的文本，在所有起始点和多次查询之间共用
+    text_blocks, block_texts, cleaned_texts, char_sets = _get_page_blocks(page_info)
+    
+    if not text_blocks:
+        return []
+    
+    # 从某个起始点开始的连续匹配，实际从其后第一个能单独加入的块开始，
+    # 结果只取决于该块，同一个块的匹配结果在各起始点之间复用
+    first_matchable = _find_first_matchable_blocks(cleaned_texts, cleaned_text, similarity_threshold)
+    match_cache = {}
+    page_matches = []
+    
+    # 遍历每个文本块作为起始点，寻找连续匹配
+    for start_idx, start_clean in enumerate(cleaned_texts):
+        if start_clean is None:
+            continue
+        
+        # 快速预检查：如果起始块就不包含目标文本的关键词，跳过
+        if key_char_set is not None and key_char_set.isdisjoint(char_sets[start_idx]):
+            continue
+        
+        first_idx = first_matchable[start_idx]
+        if first_idx is None:
+            continue  # 之后没有能加入的块，不会产生匹配
+        
+        if first_idx not in match_cache:
+            # 查找从当前块开始的连续匹配
+            matched_indices, similarity = _match_continuous_blocks(
+                cleaned_texts, first_idx, cleaned_text, similarity_threshold
+            )
+            match_cache[first_idx] = _build_match_result(
+                page_idx, page_size, text_blocks, block_texts, matched_indices, similarity
+            ) if matched_indices and similarity >= similarity_threshold else None
+        
+        match_result = match_cache[first_idx]
+        if match_result is not None:
+            page_matches.append(match_result)
     
-    return matched_blocks, final_similarity
+    return page_matches
 
 
-def mineru_chunk_locate(filename: str, text: str, similarity_threshold: float = 0.6, page_number: Optional[int] = None) -> Dict[str, Any]:
+def mineru_chunk_locate(filename: str, text: str, similarity_threshold: float = 0.6, page_number: Optional[int] = None,
+                        json_data: Optional[Dict] = None) -> Dict[str, Any]:
     """
     根据文本匹配其在全文中的坐标和页码索引
     
@@ -174,6 +410,7 @@ def mineru_chunk_locate(filename: str, text: str, similarity_threshold: float =
         text: 待匹配的文本
         similarity_threshold: 相似度阈值
         page_number: 起始页面索引（从0开始），如果为None则从第0页开始搜索
+        json_data: 已解析的middle.json数据，为None时按文件名从磁盘加载
         
     Returns:
         匹配结果字典
@@ -188,7 +425,8 @@ def mineru_chunk_locate(filename: str, text: str, similarity_threshold: float =
         }
     if(len(cleaned_text)<100):similarity_threshold = 0.8; #短文本支持 高精度匹配
     # 2. 加载middle.json文件
-    json_data = load_middle_json(filename)
+    if json_data is None:
+        json_data = load_middle_json(filename)
     if not json_data:
         return {
             "success": False,
@@ -207,6 +445,9 @@ def mineru_chunk_locate(filename: str, text: str, similarity_threshold: float =
     # 3. 遍历所有页面，查找匹配的para_blocks
     all_matches = []
     
+    # 长文本的快速预检查字符（简单方法：取目标文本的前5个字符），对所有页面都相同
+    key_char_set = frozenset(cleaned_text[:5]) if len(cleaned_text) > 50 else None
+    
     # 确定起始页面索引
     start_page = page_number if page_number is not None else 0
     if start_page >= len(pdf_info):
@@ -216,80 +457,23 @@ def mineru_chunk_locate(filename: str, text: str, similarity_threshold: float =
             "results": []
         }
     
-    for page_idx, page_info in enumerate(pdf_info):
-        # 跳过指定页面之前的页面
-        if page_idx < start_page:
-            continue
-        para_blocks = page_info.get('para_blocks', [])
-        page_size = page_info.get('page_size', [0, 0])
-        
-        # 筛选type为text的块
-        text_blocks = [block for block in para_blocks if block.get('type') == 'text']
-        
-        if not text_blocks:
-            continue
-        
-        # 遍历每个文本块作为起始点，寻找连续匹配
-        for start_idx, start_block in enumerate(text_blocks):
-            start_text = extract_text_from_para_block(start_block)
-            if not start_text:
-                continue
-            
-            # 快速预检查：如果起始块就不包含目标文本的关键词，跳过
-            start_clean = clean_text_for_matching(start_text)
-            if len(cleaned_text) > 50:  # 长文本检查关键词重叠
-                # 提取目标文本的关键词（简单方法：取前面的字符）
-                key_chars = cleaned_text[:20] if len(cleaned_text) >= 20 else cleaned_text
-                if not any(char in start_clean for char in key_chars[:5]):
-                    continue
-            
-            # 查找从当前块开始的连续匹配
-            matched_blocks, similarity = find_continuous_blocks(
-                text_blocks, start_idx, text, similarity_threshold
-            )
-            
-            if matched_blocks and similarity >= similarity_threshold:
-                # 计算合并后的边界框
-                combined_bbox = calculate_combined_bbox(matched_blocks)
-                
-                # 提取匹配的文本预览
-                matched_text = ""
-                for block in matched_blocks:
-                    matched_text += extract_text_from_para_block(block)
-                
-                match_result = {
-                    "page_idx": page_idx,
-                    "page_size": page_size,
-                    "bbox": combined_bbox,
-                    "similarity": round(similarity, 3),
-                    "block_count": len(matched_blocks),
-                    "matched_text_preview": matched_text[:200] + "..." if len(matched_text) > 200 else matched_text,
-                    "block_details": [
-                        {
-                            "bbox": block.get('bbox', []),
-                            "bbox_fs": block.get('bbox_fs', []),
-                            "index": int(block.get('index', 0))  # 确保index是整数
-                        }
-                        for block in matched_blocks
-                    ]
-                }
-                
-                all_matches.append(match_result)
-    
-    # 4. 按相似度排序并去重
-    all_matches.sort(key=lambda x: x['similarity'], reverse=True)
-    
-    # 简单去重：移除重叠度很高的结果
+    for page_idx in range(max(start_page, 0), len(pdf_info)):
+        all_matches.extend(_scan_page(page_idx, pdf_info[page_idx], cleaned_text,
+                                      similarity_threshold, key_char_set))
+    
+    # 4. 按相似度排序并去重（返回信息中包含去重后的结果总数，因此对全部结果排序）
+    all_matches.sort(key=itemgetter('similarity'), reverse=True)
+    
+    # 简单去重：移除重叠度很高的结果（只有同一页的结果才可能重叠，按页分组比较）
     unique_matches = []
+    kept_bboxes_by_page = {}
     for match in all_matches:
-        is_duplicate = False
-        for existing in unique_matches:
-            if (match['page_idx'] == existing['page_idx'] and 
-                bbox_overlap_ratio(match['bbox'], existing['bbox']) > 0.65):
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            unique_matches.append(match)
+        kept_bboxes = kept_bboxes_by_page.setdefault(match['page_idx'], [])
+        bbox = match['bbox']
+        if any(bbox_overlap_ratio(bbox, kept) > 0.65 for kept in kept_bboxes):
+            continue
+        kept_bboxes.append(bbox)
+        unique_matches.append(match)
     
     # 5. 返回结果
     if unique_matches:
@@ -334,13 +518,12 @@ def calculate_combined_bbox(blocks: List[Dict]) -> List[float]:
     if not all_bboxes:
         return [0, 0, 0, 0]
     
-    # 计算最小外接矩形
-    x0 = min(bbox[0] for bbox in all_bboxes)
-    y0 = min(bbox[1] for bbox in all_bboxes)
-    x1 = max(bbox[2] for bbox in all_bboxes)
-    y1 = max(bbox[3] for bbox in all_bboxes)
+    if len(all_bboxes) == 1:
+        return list(all_bboxes[0][:4])
     
-    return [x0, y0, x1, y1]
+    # 计算最小外接矩形：按列转置后由内置min/max在C层完成比较
+    columns = list(zip(*all_bboxes))
+    return [min(columns[0]), min(columns[1]), max(columns[2]), max(columns[3])]
 
 
 def bbox_overlap_ratio(bbox1: List[float], bbox2: List[float]) -> float:
@@ -357,11 +540,14 @@ def bbox_overlap_ratio(bbox1: List[float], bbox2: List[float]) -> float:
     if len(bbox1) < 4 or len(bbox2) < 4:
         return 0.0
     
+    ax0, ay0, ax1, ay1 = bbox1[:4]
+    bx0, by0, bx1, by1 = bbox2[:4]
+    
     # 计算交集
-    x0 = max(bbox1[0], bbox2[0])
-    y0 = max(bbox1[1], bbox2[1])
-    x1 = min(bbox1[2], bbox2[2])
-    y1 = min(bbox1[3], bbox2[3])
+    x0 = ax0 if ax0 > bx0 else bx0
+    y0 = ay0 if ay0 > by0 else by0
+    x1 = ax1 if ax1 < bx1 else bx1
+    y1 = ay1 if ay1 < by1 else by1
     
     if x1 <= x0 or y1 <= y0:
         return 0.0  # 没有交集
@@ -369,12 +555,8 @@ def bbox_overlap_ratio(bbox1: List[float], bbox2: List[float]) -> float:
     # 交集面积
     intersection = (x1 - x0) * (y1 - y0)
     
-    # 各自面积
-    area1 = (bbox1[2] - bbox1[0]) * (bbox1[3] - bbox1[1])
-    area2 = (bbox2[2] - bbox2[0]) * (bbox2[3] - bbox2[1])
-    
-    # 并集面积
-    union = area1 + area2 - intersection
+    # 并集面积 = 各自面积之和 - 交集面积
+    union = (ax1 - ax0) * (ay1 - ay0) + (bx1 - bx0) * (by1 - by0) - intersection
     
     if union <= 0:
         return 0.0
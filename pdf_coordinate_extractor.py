@@ -99,8 +99,8 @@ def extract_with_pdfplumber(pdf_path: str) -> Dict[str, Any]:
     return result
 
 
-def extract_with_pymupdf(pdf_path: str) -> Dict[str, Any]:
-    """使用PyMuPDF提取PDF坐标信息"""
+def extract_with_pymupdf(pdf_path: str, render_pages: bool = True) -> Dict[str, Any]:
+    """使用PyMuPDF提取PDF坐标信息（render_pages 为False时不渲染页面可视化图像）"""
     try:
         import pymupdf as fitz  # 新版本的导入方式
     except ImportError:
@@ -182,7 +182,9 @@ def extract_with_pymupdf(pdf_path: str) -> Dict[str, Any]:
         
         result["pages"].append(page_data)
         
-        # 创建可视化图像
+        # 创建可视化图像（整页渲染是最耗时的步骤，只需坐标时可跳过）
+        if not render_pages:
+            continue
         try:
             pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))  # 2倍分辨率
             output_path = f"page_{page_num + 1}_pymupdf_visualization.png"
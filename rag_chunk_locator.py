@@ -4,86 +4,278 @@ RAG知识切片坐标定位器 - 优化版
 专门用于在PDF中定位RAG系统的知识切片位置，返回最佳匹配区域
 """
 
+import os
 import re
-from typing import List, Dict, Any, Tuple, Optional
+import hashlib
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import cached_property, lru_cache, partial
+from typing import List, Dict, Any, Tuple, Optional, Union, Callable
 from difflib import SequenceMatcher
 import json
 
-def find_rag_chunk_coordinates(chunk_text: str, pdf_path: str, 
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+# RapidFuzz的Indel相似度（基于最长公共子序列）由C++实现，用作SequenceMatcher的相似度上界
+try:
+    from rapidfuzz.distance import Indel
+except ImportError:
+    Indel = None
+
+logger = logging.getLogger(__name__)
+
+# analyze_chunk_content 的结果缓存（LRU），长文本以摘要为键以限制内存占用
+_ANALYSIS_CACHE_SIZE = 4096
+_ANALYSIS_KEY_MAX_LEN = 256
+_analysis_cache: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+_DIGIT_PATTERN = re.compile(r'\d')
+
+# 文本清理、分句和关键词提取使用的正则表达式
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_DISALLOWED_CHAR_PATTERN = re.compile(r'[^\w\s\u4e00-\u9fff，。！？；：、]')
+_SENTENCE_SPLIT_PATTERN = re.compile(r'[。！？\.\!\?]+')
+_KEY_PHRASE_PATTERN = re.compile(r'[\u4e00-\u9fff]+|[a-zA-Z]{2,}')
+_SHORT_KEYWORD_PATTERN = re.compile(r'[\u4e00-\u9fff]{2,}|[a-zA-Z]{3,}')
+
+# 关键词提取时过滤的常见停用词
+_STOPWORDS = frozenset({'的', '和', '或', '及', '与', '对', '从', '在', '为', '是', '了', '到', '由', '有', '被', '所', '等'})
+_SHORT_TEXT_STOPWORDS = _STOPWORDS | {'这', '那', '一个', '可以', '应该'}
+
+# 按路径复用已打开的PDF文档及其逐页提取结果（LRU），文件修改时间或大小变化后重新打开
+_DOC_POOL_SIZE = 16
+_doc_pool: "OrderedDict[str, Tuple[Tuple[int, int], _DocPages]]" = OrderedDict()
+# PyMuPDF的Document对象不能被多个线程同时使用，使用期间一直持有该锁
+_doc_pool_lock = threading.Lock()
+
+def find_rag_chunk_coordinates(chunk_text: str, pdf_path: Union[str, bytes], 
                               similarity_threshold: float = 0.7,
-                              return_best_only: bool = True) -> List[Dict[str, Any]]:
+                              return_best_only: bool = True,
+                              cache_document: bool = True) -> List[Dict[str, Any]]:
     """
     在PDF中定位RAG知识切片的坐标 - 返回最佳匹配区域
     
     Args:
         chunk_text (str): RAG知识切片的文本内容
-        pdf_path (str): PDF文件路径
+        pdf_path (str | bytes): PDF文件路径，或PDF文件的二进制内容
         similarity_threshold (float): 文本相似度阈值 (0-1)
         return_best_only (bool): 是否只返回最佳匹配
+        cache_document (bool): 是否将文件路径对应的文档放入文档池以供后续查询复用，
+            只使用一次的文件（如上传的临时文件）应传入False
     
     Returns:
         list: 包含切片位置信息的列表（默认只返回最佳匹配）
     """
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        try:
-            import fitz
-        except ImportError:
-            raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    if fitz is None:
+        raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    
+    if not cache_document and isinstance(pdf_path, str):
+        # 不放入文档池，用完立即关闭
+        with fitz.open(pdf_path) as doc:
+            return find_rag_chunk_coordinates(chunk_text, _DocPages(doc),
+                                              similarity_threshold, return_best_only)
     
     # 预处理切片文本
     chunk_text_clean = _clean_text(chunk_text)
     chunk_length = len(chunk_text_clean)
     
-    print(f"正在分析切片... 长度: {chunk_length} 字符")
+    logger.info("正在分析切片... 长度: %d 字符", chunk_length)
     
     # 根据文本长度选择不同的匹配策略
     if chunk_length < 100:
-        print("📝 使用短文本匹配策略")
+        logger.info("📝 使用短文本匹配策略")
         return _find_short_text_coordinates(chunk_text_clean, pdf_path, similarity_threshold, return_best_only)
     else:
-        print("📖 使用长文本匹配策略")
+        logger.info("📖 使用长文本匹配策略")
         return _find_long_text_coordinates(chunk_text_clean, pdf_path, similarity_threshold, return_best_only)
 
 
+def find_rag_chunk_coordinates_from_bytes(chunk_text: str, pdf_bytes: bytes,
+                                         similarity_threshold: float = 0.7,
+                                         return_best_only: bool = True) -> List[Dict[str, Any]]:
+    """
+    在内存中的PDF里定位RAG知识切片的坐标，无需先写入临时文件
+    
+    Args:
+        chunk_text (str): RAG知识切片的文本内容
+        pdf_bytes (bytes): PDF文件的二进制内容
+        similarity_threshold (float): 文本相似度阈值 (0-1)
+        return_best_only (bool): 是否只返回最佳匹配
+    
+    Returns:
+        list: 包含切片位置信息的列表（默认只返回最佳匹配）
+    """
+    return find_rag_chunk_coordinates(chunk_text, pdf_bytes, similarity_threshold, return_best_only)
+
+
+def find_rag_chunks_batch(chunk_texts: List[str], pdf_path: Union[str, bytes],
+                          similarity_threshold: float = 0.7,
+                          return_best_only: bool = True) -> List[List[Dict[str, Any]]]:
+    """
+    在同一个PDF中依次定位多个RAG知识切片的坐标
+    
+    PDF只打开一次，各页提取得到的文本和区域在所有切片间共享
+    
+    Args:
+        chunk_texts (list[str]): RAG知识切片的文本内容列表
+        pdf_path (str | bytes): PDF文件路径，或PDF文件的二进制内容
+        similarity_threshold (float): 文本相似度阈值 (0-1)
+        return_best_only (bool): 是否只返回最佳匹配
+    
+    Returns:
+        list: 与 chunk_texts 一一对应的定位结果列表
+    """
+    if fitz is None:
+        raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    
+    with _open_pdf_pages(fitz, pdf_path) as pages:
+        return [find_rag_chunk_coordinates(chunk_text, pages, similarity_threshold, return_best_only)
+                for chunk_text in chunk_texts]
+
+
+def exact_line_key(text: str) -> bytes:
+    """精确匹配索引使用的键：去除首尾空白后的文本摘要"""
+    return hashlib.blake2b(text.strip().encode('utf-8'), digest_size=8).digest()
+
+
+def build_exact_line_index(pdf_path: str) -> Dict[bytes, Tuple[int, List[float], str]]:
+    """
+    为PDF中的每一行文本建立精确匹配索引
+    
+    Args:
+        pdf_path (str): PDF文件路径
+    
+    Returns:
+        dict: exact_line_key(行文本) -> (页码, 行边界框, 行文本)，相同文本保留首次出现的位置
+    """
+    if fitz is None:
+        raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    
+    index = {}
+    with _open_pdf(fitz, pdf_path) as doc:
+        for page_num, page in enumerate(doc):
+            text_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES)
+            for block in text_dict["blocks"]:
+                if block.get("type") != 0:  # 只处理文本块
+                    continue
+                for line in block["lines"]:
+                    line_text = "".join(span["text"] for span in line["spans"]).strip()
+                    if line_text:
+                        index.setdefault(exact_line_key(line_text),
+                                         (page_num + 1, list(line["bbox"]), line_text))
+    return index
+
+
+@contextmanager
+def _open_pdf(fitz, pdf_source: Union[str, bytes]):
+    """打开PDF文件路径或内存中的PDF数据，文件路径对应的文档从文档池中复用"""
+    with _open_pdf_pages(fitz, pdf_source) as pages:
+        yield pages.doc
+
+
+@contextmanager
+def open_pooled_pdf(pdf_path: str):
+    """
+    从文档池中打开PDF文件，供其他模块共用同一个文档池
+    
+    同一文件在修改时间和大小不变时复用已打开的文档；使用期间持有文档池的锁，
+    调用方不要关闭返回的文档
+    """
+    if fitz is None:
+        raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    
+    with _open_pdf(fitz, pdf_path) as doc:
+        yield doc
+
+
+@contextmanager
+def _open_pdf_pages(fitz, pdf_source: Union[str, bytes, "_DocPages"]):
+    """
+    打开PDF并返回其逐页提取缓存
+    
+    文件路径对应的缓存随文档池在多次查询间复用；查询结束后释放各页的页面对象和TextPage，
+    只保留从中得到的文本和区域。传入已打开的 _DocPages 时直接使用（批量查询时共享）
+    """
+    if isinstance(pdf_source, _DocPages):
+        yield pdf_source
+        return
+    
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        with fitz.open(stream=pdf_source, filetype="pdf") as doc:
+            yield _DocPages(doc)
+        return
+    
+    with _doc_pool_lock:
+        pages = _get_pooled_pages(fitz, pdf_source)
+        try:
+            yield pages
+        finally:
+            pages.release()
+
+
+def _get_pooled_pages(fitz, pdf_path: str) -> "_DocPages":
+    """从文档池取出PDF文档的逐页缓存，不存在或已过期时重新打开（调用方需持有 _doc_pool_lock）"""
+    try:
+        st = os.stat(pdf_path)
+    except OSError:
+        # 文件已被删除或不可访问时，同时关闭池中对应的旧文档
+        entry = _doc_pool.pop(pdf_path, None)
+        if entry is not None:
+            entry[1].doc.close()
+        raise
+    version = (st.st_mtime_ns, st.st_size)
+    
+    entry = _doc_pool.get(pdf_path)
+    if entry is not None:
+        if entry[0] == version:
+            _doc_pool.move_to_end(pdf_path)
+            return entry[1]
+        del _doc_pool[pdf_path]
+        entry[1].doc.close()
+    
+    pages = _DocPages(fitz.open(pdf_path))
+    _doc_pool[pdf_path] = (version, pages)
+    if len(_doc_pool) > _DOC_POOL_SIZE:
+        _, (_, evicted) = _doc_pool.popitem(last=False)
+        evicted.doc.close()
+    return pages
+
+
 def _find_short_text_coordinates(chunk_text: str, pdf_path: str, 
                                 similarity_threshold: float, return_best_only: bool) -> List[Dict[str, Any]]:
     """短文本匹配策略 - 更灵活的匹配方法"""
     
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        import fitz
-    
     # 短文本使用更简单的关键词
     chunk_keywords = _extract_short_text_keywords(chunk_text)
-    print(f"短文本关键词: {chunk_keywords[:3]}")
+    logger.info("短文本关键词: %s", chunk_keywords[:3])
     
     results = []
-    doc = fitz.open(pdf_path)
-    
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        
-        # 方法1: 直接文本搜索
-        direct_matches = _find_direct_text_matches(page, chunk_text, page_num)
-        results.extend(direct_matches)
-        
-        # 方法2: 关键词匹配（降低阈值）
-        keyword_matches = _find_keyword_matches(page, chunk_keywords, chunk_text, page_num, similarity_threshold * 0.6)
-        results.extend(keyword_matches)
-        
-        # 方法3: 模糊匹配（进一步降低阈值）
-        fuzzy_matches = _find_fuzzy_matches(page, chunk_text, page_num, similarity_threshold * 0.4)
-        results.extend(fuzzy_matches)
-    
-    doc.close()
+    # PyMuPDF 不支持多线程并发访问（全局上下文非线程安全），逐页串行扫描
+    with _open_pdf_pages(fitz, pdf_path) as pages:
+        for page_num in range(pages.page_count):
+            textpages = pages[page_num]
+            page_matches = _scan_short_text_page(textpages, page_num, chunk_text, chunk_keywords,
+                                                 similarity_threshold, return_best_only)
+            # 该页扫描完毕后立即释放MuPDF页面对象，避免整份文档的页面同时驻留内存
+            textpages.release()
+            results.extend(page_matches)
+            # 相似度已达上限1.0，后续页面不可能更优，只需最佳结果时提前结束
+            if return_best_only and _has_perfect_match(page_matches):
+                break
     
     # 短文本结果处理
     results = _process_short_text_results(results, return_best_only)
     
-    print(f"短文本匹配找到 {len(results)} 个结果")
+    logger.info("短文本匹配找到 %d 个结果", len(results))
     return results
 
 
@@ -91,46 +283,24 @@ def _find_long_text_coordinates(chunk_text: str, pdf_path: str,
                                similarity_threshold: float, return_best_only: bool) -> List[Dict[str, Any]]:
     """长文本匹配策略 - 原有的整体匹配方法"""
     
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        import fitz
-    
     chunk_keywords = _extract_key_phrases(chunk_text)
-    print(f"长文本关键词: {chunk_keywords[:5]}")
+    logger.info("长文本关键词: %s", chunk_keywords[:5])
     
     results = []
-    doc = fitz.open(pdf_path)
-    
-    # 遍历每一页，寻找最佳匹配区域
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        
-        # 方法1: 整页文本匹配
-        page_text = page.get_text()
-        page_text_clean = _clean_text(page_text)
-        
-        # 计算整体相似度
-        overall_similarity = _calculate_similarity(chunk_text, page_text_clean)
-        
-        if overall_similarity >= similarity_threshold:
-            # 找到高相似度页面，定位具体区域
-            best_region = _locate_best_region_in_page(
-                page, chunk_text, chunk_keywords, page_num
-            )
-            if best_region:
-                results.append(best_region)
-        
-        # 方法2: 关键词密度匹配
-        elif _calculate_keyword_density(chunk_keywords, page_text_clean) > 0.3:
-            # 关键词密度高，可能是部分匹配
-            region = _locate_keyword_region(
-                page, chunk_keywords, page_num, chunk_text
-            )
-            if region and region['similarity'] >= similarity_threshold * 0.8:
+    # PyMuPDF 不支持多线程并发访问（全局上下文非线程安全），逐页串行扫描
+    with _open_pdf_pages(fitz, pdf_path) as pages:
+        # 遍历每一页，寻找最佳匹配区域
+        for page_num in range(pages.page_count):
+            textpages = pages[page_num]
+            region = _scan_long_text_page(textpages, page_num, chunk_text,
+                                          chunk_keywords, similarity_threshold)
+            # 该页扫描完毕后立即释放MuPDF页面对象，避免整份文档的页面同时驻留内存
+            textpages.release()
+            if region:
                 results.append(region)
-    
-    doc.close()
+                # 综合得分已达上限1.0，后续页面不可能更优，只需最佳结果时提前结束
+                if return_best_only and region['similarity'] >= 1.0:
+                    break
     
     # 按相似度排序
     results.sort(key=lambda x: x['similarity'], reverse=True)
@@ -138,35 +308,208 @@ def _find_long_text_coordinates(chunk_text: str, pdf_path: str,
     # 去重相近的区域
     results = _remove_duplicate_regions(results)
     
-    print(f"长文本匹配找到 {len(results)} 个候选区域")
+    logger.info("长文本匹配找到 %d 个候选区域", len(results))
     
     # 根据参数决定返回结果
     if return_best_only and results:
-        print(f"返回最佳匹配: 相似度 {results[0]['similarity']:.3f}")
+        logger.info("返回最佳匹配: 相似度 %.3f", results[0]['similarity'])
         return [results[0]]
     
     return results
 
 
+def _scan_short_text_page(textpages: "_PageTextPages", page_num: int, chunk_text: str,
+                          chunk_keywords: List[str], similarity_threshold: float,
+                          return_best_only: bool = False) -> List[Dict[str, Any]]:
+    """在单页中执行短文本的三种匹配方法"""
+    page = textpages.page
+    
+    # 方法1: 直接文本搜索
+    matches = _find_direct_text_matches(page, chunk_text, page_num, textpages)
+    
+    # 只需最佳结果时，直接搜索已得到相似度1.0的匹配则其余方法不可能更优
+    # （相似度相同时排序保留先找到的直接匹配）
+    if return_best_only and _has_perfect_match(matches):
+        return matches
+    
+    # 方法2: 关键词匹配（降低阈值）
+    matches.extend(_find_keyword_matches(page, chunk_keywords, chunk_text, page_num,
+                                         similarity_threshold * 0.6, textpages))
+    
+    # 方法3: 模糊匹配（进一步降低阈值）
+    matches.extend(_find_fuzzy_matches(page, chunk_text, page_num, similarity_threshold * 0.4, textpages))
+    
+    return matches
+
+
+def _scan_long_text_page(textpages: "_PageTextPages", page_num: int, chunk_text: str,
+                         chunk_keywords: List[str], similarity_threshold: float) -> Optional[Dict[str, Any]]:
+    """
+    在单页中执行长文本匹配，返回该页的候选区域
+    
+    只使用页面缓存的文本和区域，不访问 textpages.page，
+    文档池中已提取过的页面在后续查询中无需重新加载
+    """
+    # 方法1: 整页文本匹配
+    page_text_lower = textpages.clean_text_lower
+    
+    # 计算整体相似度（相似度上界达不到阈值的页面跳过完整匹配）
+    overall_similarity = _lower_similarity(chunk_text.lower(), page_text_lower,
+                                           score_cutoff=similarity_threshold)
+    
+    if overall_similarity >= similarity_threshold:
+        # 找到高相似度页面，定位具体区域
+        return _locate_best_region_in_page(
+            None, chunk_text, chunk_keywords, page_num, textpages
+        )
+    
+    # 方法2: 关键词密度匹配
+    if _keyword_density_lower(_lower_all(chunk_keywords), page_text_lower) > 0.3:
+        # 关键词密度高，可能是部分匹配
+        region = _locate_keyword_region(
+            None, chunk_keywords, page_num, chunk_text, textpages,
+            score_cutoff=similarity_threshold * 0.8
+        )
+        if region and region['similarity'] >= similarity_threshold * 0.8:
+            return region
+    
+    return None
+
+
+def _has_perfect_match(matches: List[Dict[str, Any]]) -> bool:
+    """是否存在相似度达到上限1.0的匹配"""
+    return any(match["similarity"] >= 1.0 for match in matches)
+
+
+@lru_cache(maxsize=1024)
 def _extract_short_text_keywords(text: str) -> List[str]:
-    """为短文本提取关键词 - 更简单的策略"""
+    """为短文本提取关键词 - 更简单的策略（相同文本的结果会被缓存，调用方不应修改返回的列表）"""
     # 短文本直接使用有意义的词汇
-    words = re.findall(r'[\u4e00-\u9fff]{2,}|[a-zA-Z]{3,}', text)
+    words = _SHORT_KEYWORD_PATTERN.findall(text)
     
     # 过滤常见停用词
-    stopwords = {'的', '和', '或', '及', '与', '对', '从', '在', '为', '是', '了', '到', '由', '有', '被', '所', '等', '这', '那', '一个', '可以', '应该'}
-    keywords = [word for word in words if word not in stopwords and len(word) >= 2]
+    keywords = [word for word in words if word not in _SHORT_TEXT_STOPWORDS and len(word) >= 2]
     
     # 短文本保留更多关键词
     return keywords[:10]
 
 
-def _find_direct_text_matches(page, chunk_text: str, page_num: int) -> List[Dict[str, Any]]:
+class _DocPages:
+    """PDF文档中按需创建的逐页提取缓存"""
+    
+    def __init__(self, doc):
+        self.doc = doc
+        self._pages: Dict[int, _PageTextPages] = {}
+    
+    @property
+    def page_count(self) -> int:
+        return self.doc.page_count
+    
+    def __getitem__(self, page_num: int) -> "_PageTextPages":
+        textpages = self._pages.get(page_num)
+        if textpages is None:
+            textpages = self._pages[page_num] = _PageTextPages(
+                self.doc[page_num], partial(self.doc.load_page, page_num)
+            )
+        return textpages
+    
+    def release(self):
+        """释放各页的MuPDF页面对象和TextPage（提取得到的文本和区域继续保留）"""
+        for textpages in self._pages.values():
+            textpages.release()
+
+
+class _PageTextPages:
+    """
+    单个页面的TextPage缓存
+    
+    同一页上的各匹配方法共享同一个实例，相同标志位的文本提取在每页只执行一次；
+    文档池中的实例还会在多次查询间复用提取得到的文本和区域
+    """
+    
+    def __init__(self, page, load_page: Optional[Callable[[], Any]] = None):
+        """load_page 用于在 release() 之后重新加载页面，未提供时页面对象一直保留"""
+        self._page = page
+        self._load_page = load_page
+        self._textpages = {}
+    
+    @property
+    def page(self):
+        if self._page is None:
+            self._page = self._load_page()
+        return self._page
+    
+    def textpage(self, flags: int):
+        """按标志位缓存的TextPage"""
+        if flags not in self._textpages:
+            self._textpages[flags] = self.page.get_textpage(flags=flags)
+        return self._textpages[flags]
+    
+    def release(self):
+        """释放已创建的TextPage和可重新加载的页面对象，之后需要时重新提取"""
+        self._textpages.clear()
+        if self._load_page is not None:
+            self._page = None
+    
+    def search(self, text: str) -> list:
+        """与 page.search_for(text) 一致的搜索（使用其默认标志位）"""
+        flags = (fitz.TEXT_DEHYPHENATE | fitz.TEXT_PRESERVE_WHITESPACE
+                 | fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_MEDIABOX_CLIP)
+        return self.page.search_for(text, textpage=self.textpage(flags))
+    
+    def get_textbox(self, rect) -> str:
+        """提取矩形区域内的文字（与 page.get_textbox 一致使用默认标志位）"""
+        return self.page.get_textbox(rect, textpage=self.textpage(0))
+    
+    @property
+    def _text_flags(self) -> int:
+        """整页文本与字典提取共用的标志位（不保留图像，与 get_text() 默认值相同）"""
+        return fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    
+    @cached_property
+    def clean_text_lower(self) -> str:
+        """清理并转换为小写的整页文本"""
+        return _clean_text(self.page.get_text(textpage=self.textpage(self._text_flags))).lower()
+    
+    def _text_dict(self) -> Dict[str, Any]:
+        # 只需要文本块，不保留图像块以免提取图片二进制数据；
+        # 字典本身不缓存，只缓存由它得到的文本块和区域
+        return self.page.get_text("dict", textpage=self.textpage(self._text_flags))
+    
+    @cached_property
+    def text_regions(self) -> List[Dict[str, Any]]:
+        """由相邻文本块组合成的文本区域"""
+        return _group_text_blocks(self._text_dict()["blocks"])
+    
+    @cached_property
+    def text_regions_lower(self) -> List[str]:
+        """各文本区域清理并转换为小写后的文字，与 text_regions 一一对应"""
+        return [_clean_text(region["text"]).lower() for region in self.text_regions]
+    
+    @cached_property
+    def text_blocks(self) -> List[Dict[str, Any]]:
+        """页面中所有非空文本块的清理后文字与边界框"""
+        text_blocks = []
+        for block in self._text_dict()["blocks"]:
+            if block.get("type") == 0:  # 文本块
+                block_text = _flatten_block_text(block)
+                
+                if block_text.strip():
+                    text_blocks.append({
+                        "text": _clean_text(block_text),
+                        "bbox": block["bbox"]
+                    })
+        return text_blocks
+
+
+def _find_direct_text_matches(page, chunk_text: str, page_num: int,
+                              textpages: Optional[_PageTextPages] = None) -> List[Dict[str, Any]]:
     """直接文本搜索匹配"""
     matches = []
-    import pymupdf as fitz
+    if textpages is None:
+        textpages = _PageTextPages(page)
     # 尝试找到包含部分文本的区域
-    text_instances = page.search_for(chunk_text[:20])  # 搜索前20个字符
+    text_instances = textpages.search(chunk_text[:20])  # 搜索前20个字符
     
     for inst in text_instances:
         # 获取周围更大的文本区域
@@ -179,8 +522,8 @@ def _find_direct_text_matches(page, chunk_text: str, page_num: int) -> List[Dict
         page_rect = page.rect
         expanded_rect = expanded_rect & page_rect
         
-        region_text = page.get_textbox(expanded_rect)
-        similarity = _calculate_similarity(chunk_text, _clean_text(region_text))
+        region_text = textpages.get_textbox(expanded_rect)
+        similarity = _calculate_similarity(chunk_text, _clean_text(region_text), score_cutoff=0.3)
         
         if similarity > 0.3:  # 较低的阈值
             matches.append({
@@ -195,17 +538,19 @@ def _find_direct_text_matches(page, chunk_text: str, page_num: int) -> List[Dict
     return matches
 
 
-def _find_keyword_matches(page, keywords: List[str], chunk_text: str, page_num: int, threshold: float) -> List[Dict[str, Any]]:
+def _find_keyword_matches(page, keywords: List[str], chunk_text: str, page_num: int, threshold: float,
+                          textpages: Optional[_PageTextPages] = None) -> List[Dict[str, Any]]:
     """基于关键词的匹配"""
     matches = []
     
     if not keywords:
         return matches
-    import pymupdf as fitz
+    if textpages is None:
+        textpages = _PageTextPages(page)
     # 搜索主要关键词
     main_keyword = keywords[0] if keywords else ""
     if len(main_keyword) >= 3:
-        keyword_instances = page.search_for(main_keyword)
+        keyword_instances = textpages.search(main_keyword)
         
         for inst in keyword_instances:
             # 扩展搜索区域
@@ -217,8 +562,8 @@ def _find_keyword_matches(page, keywords: List[str], chunk_text: str, page_num:
             page_rect = page.rect
             expanded_rect = expanded_rect & page_rect
             
-            region_text = page.get_textbox(expanded_rect)
-            similarity = _calculate_similarity(chunk_text, _clean_text(region_text))
+            region_text = textpages.get_textbox(expanded_rect)
+            similarity = _calculate_similarity(chunk_text, _clean_text(region_text), score_cutoff=threshold)
             
             if similarity >= threshold:
                 matches.append({
@@ -234,30 +579,20 @@ def _find_keyword_matches(page, keywords: List[str], chunk_text: str, page_num:
     return matches
 
 
-def _find_fuzzy_matches(page, chunk_text: str, page_num: int, threshold: float) -> List[Dict[str, Any]]:
+def _find_fuzzy_matches(page, chunk_text: str, page_num: int, threshold: float,
+                        textpages: Optional[_PageTextPages] = None) -> List[Dict[str, Any]]:
     """模糊匹配 - 逐段落搜索"""
     matches = []
     
     # 获取页面所有文本块
-    text_dict = page.get_text("dict")
-    text_blocks = []
-    
-    for block in text_dict["blocks"]:
-        if block.get("type") == 0:  # 文本块
-            block_text = ""
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    block_text += span["text"] + " "
-            
-            if block_text.strip():
-                text_blocks.append({
-                    "text": _clean_text(block_text),
-                    "bbox": block["bbox"]
-                })
+    if textpages is None:
+        textpages = _PageTextPages(page)
+    text_blocks = textpages.text_blocks
     
     # 逐块检查相似度
+    chunk_lower = chunk_text.lower()
     for block in text_blocks:
-        similarity = _calculate_similarity(chunk_text, block["text"])
+        similarity = _lower_similarity(chunk_lower, block["text"].lower(), score_cutoff=threshold)
         
         if similarity >= threshold:
             matches.append({
@@ -290,33 +625,10 @@ def _process_short_text_results(results: List[Dict[str, Any]], return_best_only:
     return results[:5]  # 短文本最多返回5个结果
 
 
-def _clean_text(text: str) -> str:
-    """清理和标准化文本"""
-    # 移除多余的空白字符
-    text = re.sub(r'\s+', ' ', text)
-    # 移除特殊字符但保留基本标点
-    text = re.sub(r'[^\w\s\u4e00-\u9fff.,!?;:()\[\]{}""\'\'-]', ' ', text)
-    return text.strip()
-
-
-def _split_into_sentences(text: str) -> List[str]:
-    """将文本分割成句子"""
-    # 使用多种标点符号分割
-    sentences = re.split(r'[.!?。！？；;]\s*', text)
-    # 过滤掉太短的句子
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
-    return sentences
-
-
 def _extract_page_content(page) -> Dict[str, Any]:
     """提取页面的所有内容"""
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        try:
-            import fitz
-        except ImportError:
-            return {}
+    if fitz is None:
+        return {}
     
     # 获取文本块信息
     text_dict = page.get_text("dict")
@@ -331,13 +643,9 @@ def _extract_page_content(page) -> Dict[str, Any]:
     # 处理文本块
     for block in text_dict["blocks"]:
         if block.get("type") == 0:  # 文本块
-            block_text = ""
+            block_text = _flatten_block_text(block)
             block_bbox = block["bbox"]
             
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    block_text += span["text"] + " "
-            
             if block_text.strip():
                 content["text_blocks"].append({
                     "text": _clean_text(block_text),
@@ -356,8 +664,10 @@ def _extract_page_content(page) -> Dict[str, Any]:
     drawings = page.get_drawings()
     table_areas = _detect_table_areas(drawings)
     
+    # 多个表格区域共用同一个TextPage，避免每个区域重新提取整页文字
+    textpages = _PageTextPages(page)
     for table_area in table_areas:
-        table_text = page.get_textbox(fitz.Rect(table_area))
+        table_text = textpages.get_textbox(fitz.Rect(table_area))
         if table_text.strip():
             content["tables"].append({
                 "bbox": table_area,
@@ -398,37 +708,45 @@ def _detect_table_areas(drawings) -> List[List[float]]:
     return []
 
 
-def _locate_best_region_in_page(page, chunk_text: str, keywords: List[str], 
-                               page_num: int) -> Optional[Dict[str, Any]]:
-    """在页面中定位最佳匹配区域"""
+def _locate_best_region_in_page(page, chunk_text: str, keywords: List[str], page_num: int,
+                                textpages: Optional[_PageTextPages] = None) -> Optional[Dict[str, Any]]:
+    """在页面中定位最佳匹配区域（提供 textpages 时不使用 page）"""
     
     # 获取文本块信息
-    text_dict = page.get_text("dict")
+    if textpages is None:
+        textpages = _PageTextPages(page)
     
-    best_match = None
+    best_region = None
     best_similarity = 0
-    best_bbox = None
     
     # 组合相邻的文本块来形成更大的文本区域
-    text_regions = _group_text_blocks(text_dict["blocks"])
+    text_regions = textpages.text_regions
     
-    for region in text_regions:
-        region_text = _clean_text(region["text"])
-        similarity = _calculate_similarity(chunk_text, region_text)
-        
+    # 切片和关键词只转换一次小写，各区域文本也只转换一次
+    chunk_lower = chunk_text.lower()
+    keywords_lower = _lower_all(keywords)
+    
+    for region, region_lower in zip(text_regions, textpages.text_regions_lower):
         # 额外考虑关键词匹配度
-        keyword_score = _calculate_keyword_density(keywords, region_text)
+        keyword_score = _keyword_density_lower(keywords_lower, region_lower)
+        
+        # 综合得分需要超过当前最佳得分（且最终需大于0.3），
+        # 相似度上界达不到所需值的区域不可能成为最佳区域，直接跳过
+        score_cutoff = (max(best_similarity, 0.3) - keyword_score * 0.3) / 0.7 - 1e-9
+        similarity = _lower_similarity(chunk_lower, region_lower, score_cutoff=score_cutoff)
+        if score_cutoff > 0 and similarity < score_cutoff:
+            continue
         combined_score = similarity * 0.7 + keyword_score * 0.3
         
         if combined_score > best_similarity:
             best_similarity = combined_score
-            best_match = region_text
-            best_bbox = region["bbox"]
+            best_region = region
     
-    if best_match and best_similarity > 0.3:
+    if best_region is not None and best_similarity > 0.3:
+        best_match = _clean_text(best_region["text"])
         return {
             "page": page_num + 1,
-            "bbox": best_bbox,
+            "bbox": list(best_region["bbox"]),  # 区域随页面缓存复用，返回副本
             "type": "best_region_match",
             "found_text": best_match[:200] + "..." if len(best_match) > 200 else best_match,
             "similarity": best_similarity,
@@ -438,6 +756,11 @@ def _locate_best_region_in_page(page, chunk_text: str, keywords: List[str],
     return None
 
 
+def _flatten_block_text(block: Dict[str, Any]) -> str:
+    """拼接文本块中所有span的文字，每个span后跟一个空格"""
+    return "".join(span["text"] + " " for line in block["lines"] for span in line["spans"])
+
+
 def _group_text_blocks(blocks) -> List[Dict[str, Any]]:
     """将相邻的文本块组合成更大的文本区域"""
     text_blocks = []
@@ -445,14 +768,11 @@ def _group_text_blocks(blocks) -> List[Dict[str, Any]]:
     # 提取所有文本块
     for block in blocks:
         if block.get("type") == 0:  # 文本块
-            block_text = ""
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    block_text += span["text"] + " "
+            block_text = _flatten_block_text(block).strip()
             
-            if block_text.strip():
+            if block_text:
                 text_blocks.append({
-                    "text": block_text.strip(),
+                    "text": block_text,
                     "bbox": block["bbox"]
                 })
     
@@ -462,67 +782,67 @@ def _group_text_blocks(blocks) -> List[Dict[str, Any]]:
     # 按Y坐标排序
     text_blocks.sort(key=lambda x: x["bbox"][1])
     
-    # 组合相邻的文本块
+    # 组合相邻的文本块，区域文本收集为片段列表、边界框保存在局部变量中，区域结束时再组装
     regions = []
-    current_region = {
-        "text": text_blocks[0]["text"],
-        "bbox": list(text_blocks[0]["bbox"])
-    }
+    texts = [text_blocks[0]["text"]]
+    x0, y0, x1, y1 = text_blocks[0]["bbox"]
     
-    for i in range(1, len(text_blocks)):
-        prev_bbox = current_region["bbox"]
-        curr_bbox = text_blocks[i]["bbox"]
+    for block in text_blocks[1:]:
+        bx0, by0, bx1, by1 = block["bbox"]
         
         # 如果垂直距离小于50，认为是同一区域
-        vertical_gap = curr_bbox[1] - prev_bbox[3]
-        
-        if vertical_gap < 50:
-            # 合并到当前区域
-            current_region["text"] += " " + text_blocks[i]["text"]
-            # 扩展边界框
-            current_region["bbox"][0] = min(current_region["bbox"][0], curr_bbox[0])
-            current_region["bbox"][1] = min(current_region["bbox"][1], curr_bbox[1])
-            current_region["bbox"][2] = max(current_region["bbox"][2], curr_bbox[2])
-            current_region["bbox"][3] = max(current_region["bbox"][3], curr_bbox[3])
+        if by0 - y1 < 50:
+            # 合并到当前区域并扩展边界框
+            texts.append(block["text"])
+            if bx0 < x0:
+                x0 = bx0
+            if by0 < y0:
+                y0 = by0
+            if bx1 > x1:
+                x1 = bx1
+            if by1 > y1:
+                y1 = by1
         else:
             # 保存当前区域，开始新区域
-            regions.append(current_region)
-            current_region = {
-                "text": text_blocks[i]["text"],
-                "bbox": list(curr_bbox)
-            }
+            regions.append({"text": " ".join(texts), "bbox": [x0, y0, x1, y1]})
+            texts = [block["text"]]
+            x0, y0, x1, y1 = bx0, by0, bx1, by1
     
     # 添加最后一个区域
-    regions.append(current_region)
+    regions.append({"text": " ".join(texts), "bbox": [x0, y0, x1, y1]})
     
     return regions
 
 
-def _locate_keyword_region(page, keywords: List[str], page_num: int, 
-                          chunk_text: str) -> Optional[Dict[str, Any]]:
-    """基于关键词密度定位区域"""
+def _locate_keyword_region(page, keywords: List[str], page_num: int, chunk_text: str,
+                           textpages: Optional[_PageTextPages] = None,
+                           score_cutoff: float = 0.0) -> Optional[Dict[str, Any]]:
+    """基于关键词密度定位区域（与原文的相似度低于 score_cutoff 时记为0，提供 textpages 时不使用 page）"""
     
-    text_dict = page.get_text("dict")
-    text_regions = _group_text_blocks(text_dict["blocks"])
+    if textpages is None:
+        textpages = _PageTextPages(page)
+    text_regions = textpages.text_regions
     
     best_region = None
+    best_region_lower = None
     best_score = 0
+    keywords_lower = _lower_all(keywords)
     
-    for region in text_regions:
-        region_text = _clean_text(region["text"])
-        keyword_density = _calculate_keyword_density(keywords, region_text)
+    for region, region_lower in zip(text_regions, textpages.text_regions_lower):
+        keyword_density = _keyword_density_lower(keywords_lower, region_lower)
         
         if keyword_density > best_score:
             best_score = keyword_density
             best_region = region
+            best_region_lower = region_lower
     
     if best_region and best_score > 0.2:
-        # 计算与原文的相似度
-        similarity = _calculate_similarity(chunk_text, _clean_text(best_region["text"]))
+        # 计算与原文的相似度（相似度上界达不到 score_cutoff 时跳过完整匹配）
+        similarity = _lower_similarity(chunk_text.lower(), best_region_lower, score_cutoff=score_cutoff)
         
         return {
             "page": page_num + 1,
-            "bbox": best_region["bbox"],
+            "bbox": list(best_region["bbox"]),  # 区域随页面缓存复用，返回副本
             "type": "keyword_region_match",
             "found_text": best_region["text"][:200] + "..." if len(best_region["text"]) > 200 else best_region["text"],
             "similarity": similarity,
@@ -533,20 +853,17 @@ def _locate_keyword_region(page, keywords: List[str], page_num: int,
     return None
 
 
+@lru_cache(maxsize=1024)
 def _extract_key_phrases(text: str) -> List[str]:
-    """提取关键短语和词汇"""
+    """提取关键短语和词汇（相同文本的结果会被缓存，调用方不应修改返回的列表）"""
     # 去除标点符号和数字，保留有意义的词汇
-    words = re.findall(r'[\u4e00-\u9fff]+|[a-zA-Z]{2,}', text)
-    
-    # 过滤掉过短的词和常见停用词
-    stopwords = {'的', '和', '或', '及', '与', '对', '从', '在', '为', '是', '了', '到', '由', '有', '被', '所', '等'}
-    keywords = [word for word in words if len(word) >= 2 and word not in stopwords]
+    words = _KEY_PHRASE_PATTERN.findall(text)
     
-    # 去重并按长度排序（优先长词）
-    keywords = list(set(keywords))
-    keywords.sort(key=len, reverse=True)
+    # 去重后过滤掉常见停用词和过短的词
+    candidates = set(words) - _STOPWORDS
     
-    return keywords[:20]  # 返回前20个关键词
+    # 只取最长的前20个关键词（优先长词），无需对全部候选词排序
+    return heapq.nlargest(20, (word for word in candidates if len(word) >= 2), key=len)
 
 
 def _calculate_keyword_density(keywords: List[str], text: str) -> float:
@@ -554,14 +871,21 @@ def _calculate_keyword_density(keywords: List[str], text: str) -> float:
     if not keywords or not text:
         return 0
     
-    text_lower = text.lower()
-    matched_keywords = 0
-    
-    for keyword in keywords:
-        if keyword.lower() in text_lower:
-            matched_keywords += 1
+    return _keyword_density_lower(_lower_all(keywords), text.lower())
+
+
+def _lower_all(keywords: List[str]) -> List[str]:
+    """将关键词列表统一转换为小写"""
+    return [keyword.lower() for keyword in keywords]
+
+
+def _keyword_density_lower(keywords_lower: List[str], text_lower: str) -> float:
+    """计算关键词密度（关键词和文本均已转换为小写）"""
+    if not keywords_lower or not text_lower:
+        return 0
     
-    return matched_keywords / len(keywords)
+    matched_keywords = sum(1 for keyword in keywords_lower if keyword in text_lower)
+    return matched_keywords / len(keywords_lower)
 
 
 def _remove_duplicate_regions(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -570,52 +894,40 @@ def _remove_duplicate_regions(results: List[Dict[str, Any]]) -> List[Dict[str, A
         return results
     
     filtered = []
+    # 只有同一页的区域才可能重复，按页分组后只与同页已保留的区域比较
+    kept_bboxes_by_page: Dict[int, List[List[float]]] = {}
     
     for result in results:
-        is_duplicate = False
+        bbox = result["bbox"]
+        kept_bboxes = kept_bboxes_by_page.setdefault(result["page"], [])
         
-        for existing in filtered:
-            # 检查是否是同一页的重叠区域
-            if result["page"] == existing["page"]:
-                overlap = _calculate_bbox_overlap(result["bbox"], existing["bbox"])
-                if overlap > 0.5:  # 50%以上重叠认为是重复
-                    is_duplicate = True
-                    break
+        # 50%以上重叠认为是重复
+        if any(_calculate_bbox_overlap(bbox, existing) > 0.5 for existing in kept_bboxes):
+            continue
         
-        if not is_duplicate:
-            filtered.append(result)
+        kept_bboxes.append(bbox)
+        filtered.append(result)
     
     return filtered
 
 
-def _calculate_similarity(text1: str, text2: str) -> float:
-    """计算两段文本的相似度"""
-    # 使用序列匹配器计算相似度
-    matcher = SequenceMatcher(None, text1.lower(), text2.lower())
-    similarity = matcher.ratio()
-    
-    # 如果一个文本包含另一个文本，给予额外加分
-    if text1.lower() in text2.lower() or text2.lower() in text1.lower():
-        similarity = max(similarity, 0.8)
-    
-    return similarity
-
-
 def _calculate_bbox_overlap(bbox1: List[float], bbox2: List[float]) -> float:
     """计算两个边界框的重叠比例"""
     x1_min, y1_min, x1_max, y1_max = bbox1
     x2_min, y2_min, x2_max, y2_max = bbox2
     
-    # 计算交集
-    intersection_x_min = max(x1_min, x2_min)
-    intersection_y_min = max(y1_min, y2_min)
-    intersection_x_max = min(x1_max, x2_max)
-    intersection_y_max = min(y1_max, y2_max)
+    # 计算交集，水平方向不相交时无需再计算垂直方向
+    intersection_width = ((x1_max if x1_max < x2_max else x2_max)
+                          - (x1_min if x1_min > x2_min else x2_min))
+    if intersection_width <= 0:
+        return 0  # 无交集
     
-    if intersection_x_min >= intersection_x_max or intersection_y_min >= intersection_y_max:
+    intersection_height = ((y1_max if y1_max < y2_max else y2_max)
+                           - (y1_min if y1_min > y2_min else y2_min))
+    if intersection_height <= 0:
         return 0  # 无交集
     
-    intersection_area = (intersection_x_max - intersection_x_min) * (intersection_y_max - intersection_y_min)
+    intersection_area = intersection_width * intersection_height
     
     # 计算并集
     area1 = (x1_max - x1_min) * (y1_max - y1_min)
@@ -625,47 +937,89 @@ def _calculate_bbox_overlap(bbox1: List[float], bbox2: List[float]) -> float:
     return intersection_area / union_area if union_area > 0 else 0
 
 
+@lru_cache(maxsize=4096)
 def _clean_text(text: str) -> str:
-    """清理和标准化文本"""
+    """清理和标准化文本（相同的文本块在多页和多次查询间反复出现，结果按原文缓存）"""
     if not text:
         return ""
     
-    # 移除多余的空白字符
-    text = re.sub(r'\s+', ' ', text.strip())
-    # 移除一些特殊字符，但保留中英文和基本标点
-    text = re.sub(r'[^\w\s\u4e00-\u9fff，。！？；：、]', ' ', text)
-    # 再次清理空白
-    text = re.sub(r'\s+', ' ', text.strip())
-    
-    return text
+    # 移除一些特殊字符，但保留中英文和基本标点，再合并多余的空白字符
+    text = _DISALLOWED_CHAR_PATTERN.sub(' ', text)
+    return _WHITESPACE_PATTERN.sub(' ', text).strip()
 
 
 def _split_into_sentences(text: str) -> List[str]:
     """将文本分割成句子"""
     # 按标点符号分割
-    sentences = re.split(r'[。！？\.\!\?]+', text)
+    sentences = _SENTENCE_SPLIT_PATTERN.split(text)
     # 过滤空句子
     sentences = [s.strip() for s in sentences if s.strip()]
     return sentences
 
 
-def _calculate_similarity(text1: str, text2: str) -> float:
-    """计算两段文本的相似度"""
-    if not text1 or not text2:
+def _calculate_similarity(text1: str, text2: str, score_cutoff: float = 0.0) -> float:
+    """计算两段文本的相似度，上界低于 score_cutoff 时直接返回0"""
+    return _lower_similarity(text1.lower(), text2.lower(), score_cutoff)
+
+
+def _lower_similarity(text1_lower: str, text2_lower: str, score_cutoff: float = 0.0) -> float:
+    """计算两段已转换为小写的文本的相似度"""
+    if not text1_lower or not text2_lower:
         return 0.0
     
+    # 先用相似度上界排除不可能达标的文本，只有可能达到阈值时才执行完整的匹配
+    if score_cutoff > 0:
+        # 长度差距给出的上界（即 real_quick_ratio），在构建SequenceMatcher的索引之前判断
+        len1, len2 = len(text1_lower), len(text2_lower)
+        total_len = len1 + len2
+        if 2.0 * min(len1, len2) / total_len < score_cutoff:
+            return 0.0
+        if Indel is not None:
+            # 匹配块组成的公共子序列不会长于最长公共子序列，Indel相似度即为上界；
+            # 按整数距离设置上限并留出微小余量，超出上限后立即结束计算
+            max_distance = int(total_len * (1.0 - max(score_cutoff - 1e-9, 0.0)))
+            if Indel.distance(text1_lower, text2_lower, score_cutoff=max_distance) > max_distance:
+                return 0.0
+        else:
+            matcher = SequenceMatcher(None, text1_lower, text2_lower)
+            if matcher.quick_ratio() < score_cutoff:
+                return 0.0
+            return matcher.ratio()
+    
     # 使用序列匹配器计算相似度
-    matcher = SequenceMatcher(None, text1.lower(), text2.lower())
-    return matcher.ratio()
+    return SequenceMatcher(None, text1_lower, text2_lower).ratio()
 
 
 def analyze_chunk_content(chunk_text: str) -> Dict[str, Any]:
-    """分析知识切片的内容特征"""
+    """分析知识切片的内容特征（相同切片的结果会被缓存）"""
+    if len(chunk_text) <= _ANALYSIS_KEY_MAX_LEN:
+        key = chunk_text
+    else:
+        key = hashlib.blake2b(chunk_text.encode('utf-8'), digest_size=16).digest()
+    
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(key)
+        if cached is not None:
+            _analysis_cache.move_to_end(key)
+            return dict(cached)
+    
+    analysis = _analyze_chunk_content(chunk_text)
+    
+    with _analysis_cache_lock:
+        _analysis_cache[key] = analysis
+        _analysis_cache.move_to_end(key)
+        if len(_analysis_cache) > _ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    return dict(analysis)
+
+
+def _analyze_chunk_content(chunk_text: str) -> Dict[str, Any]:
+    """计算切片的内容特征"""
     analysis = {
         "length": len(chunk_text),
         "sentences": len(_split_into_sentences(chunk_text)),
-        "has_numbers": bool(re.search(r'\d+', chunk_text)),
-        "has_punctuation": bool(re.search(r'[.!?。！？]', chunk_text)),
+        "has_numbers": _DIGIT_PATTERN.search(chunk_text) is not None,
+        "has_punctuation": any(mark in chunk_text for mark in '.!?。！？'),
         "language_detected": "mixed",  # 简化版本
         "complexity_score": 0.0
     }
@@ -674,7 +1028,7 @@ def analyze_chunk_content(chunk_text: str) -> Dict[str, Any]:
     complexity_factors = [
         len(chunk_text) / 1000,  # 长度因子
         analysis["sentences"] / 10,  # 句子数量因子
-        len(re.findall(r'[,;:]', chunk_text)) / 20,  # 标点复杂度
+        sum(map(chunk_text.count, ',;:')) / 20,  # 标点复杂度
     ]
     
     analysis["complexity_score"] = min(sum(complexity_factors), 1.0)
@@ -685,53 +1039,50 @@ def analyze_chunk_content(chunk_text: str) -> Dict[str, Any]:
 # 演示和测试函数
 def demo_rag_locator():
     """演示RAG切片定位功能"""
-    try:
-        import pymupdf as fitz
-    except ImportError:
+    if fitz is None:
         print("需要安装PyMuPDF来运行演示")
         return
     
     # 创建测试PDF
-    doc = fitz.open()
-    page = doc.new_page()
-    
-    # 添加复杂内容模拟RAG切片场景
-    content_blocks = [
-        "人工智能（Artificial Intelligence，AI）是指由人制造出来的机器所表现出来的智能。",
-        "通常人工智能是指通过普通计算机程序来呈现人类智能的技术。",
-        "",  # 空行
-        "机器学习是人工智能的一个重要分支，它使计算机能够在没有明确编程的情况下学习。",
-        "深度学习则是机器学习的一个子集，使用多层神经网络来处理复杂的数据模式。",
-    ]
-    
-    y_pos = 100
-    for block in content_blocks:
-        if block:  # 非空行
-            page.insert_text((50, y_pos), block, fontsize=12)
-        y_pos += 25
-    
-    # 添加表格
-    table_y = 250
-    page.draw_rect(fitz.Rect(50, table_y, 450, table_y + 100), width=1)
-    
-    # 表格内容
-    headers = ["技术", "应用领域", "发展阶段"]
-    data = [
-        ["机器学习", "数据分析", "成熟"],
-        ["深度学习", "图像识别", "快速发展"],
-    ]
-    
-    # 绘制表格
-    for i, header in enumerate(headers):
-        page.insert_text((70 + i * 120, table_y + 20), header, fontsize=10)
-    
-    for i, row in enumerate(data):
-        for j, cell in enumerate(row):
-            page.insert_text((70 + j * 120, table_y + 40 + i * 25), cell, fontsize=10)
-    
-    test_pdf = "rag_test.pdf"
-    doc.save(test_pdf)
-    doc.close()
+    with fitz.open() as doc:
+        page = doc.new_page()
+        
+        # 添加复杂内容模拟RAG切片场景
+        content_blocks = [
+            "人工智能（Artificial Intelligence，AI）是指由人制造出来的机器所表现出来的智能。",
+            "通常人工智能是指通过普通计算机程序来呈现人类智能的技术。",
+            "",  # 空行
+            "机器学习是人工智能的一个重要分支，它使计算机能够在没有明确编程的情况下学习。",
+            "深度学习则是机器学习的一个子集，使用多层神经网络来处理复杂的数据模式。",
+        ]
+        
+        y_pos = 100
+        for block in content_blocks:
+            if block:  # 非空行
+                page.insert_text((50, y_pos), block, fontsize=12)
+            y_pos += 25
+        
+        # 添加表格
+        table_y = 250
+        page.draw_rect(fitz.Rect(50, table_y, 450, table_y + 100), width=1)
+        
+        # 表格内容
+        headers = ["技术", "应用领域", "发展阶段"]
+        data = [
+            ["机器学习", "数据分析", "成熟"],
+            ["深度学习", "图像识别", "快速发展"],
+        ]
+        
+        # 绘制表格
+        for i, header in enumerate(headers):
+            page.insert_text((70 + i * 120, table_y + 20), header, fontsize=10)
+        
+        for i, row in enumerate(data):
+            for j, cell in enumerate(row):
+                page.insert_text((70 + j * 120, table_y + 40 + i * 25), cell, fontsize=10)
+        
+        test_pdf = "rag_test.pdf"
+        doc.save(test_pdf)
     print(f"RAG测试PDF已创建: {test_pdf}")
     
     # 模拟RAG知识切片
@@ -780,6 +1131,9 @@ def demo_rag_locator():
 if __name__ == "__main__":
     import sys
     
+    # 命令行运行时在控制台显示定位过程
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     if len(sys.argv) >= 3:
         chunk_content = sys.argv[1]
         pdf_file = sys.argv[2]
@@ -4,6 +4,8 @@ RAG知识切片坐标定位使用示例 - 优化版
 演示如何精确定位单个知识切片在PDF中的位置
 """
 
+import logging
+
 from rag_chunk_locator import find_rag_chunk_coordinates, analyze_chunk_content
 
 def simple_example():
@@ -135,6 +137,9 @@ def test_with_custom_chunk():
 
 
 if __name__ == "__main__":
+    # 在控制台显示定位过程
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # 运行基本示例
     simple_example()
     
@@ -8,22 +8,40 @@ import sys
 import os
 
 def main():
-    """启动API服务"""
+    """启动API服务（默认多进程生产模式，传入 --dev 时启用热重载的开发模式）"""
+    dev_mode = "--dev" in sys.argv
+    
     print("🚀 启动RAG切片定位API服务...")
     print("📍 服务地址: http://localhost:8004")
     print("📖 API文档: http://localhost:8004/docs")
     print("🏥 健康检查: http://localhost:8004/health")
+    print(f"⚙️  运行模式: {'开发(热重载)' if dev_mode else '生产(多进程)'}")
     print("-" * 50)
     
     try:
         # 启动服务
-        uvicorn.run(
-            "api_service:app",
-            host="0.0.0.0",
-            port=8004,
-            reload=True,
-            log_level="info"
-        )
+        if dev_mode:
+            uvicorn.run(
+                "api_service:app",
+                host="0.0.0.0",
+                port=8004,
+                reload=True,
+                log_level="info"
+            )
+        else:
+            workers = os.cpu_count() or 1
+            # 每个服务进程只保留一个定位工作进程，总进程数与CPU核数相当
+            os.environ.setdefault("LOCATOR_POOL_WORKERS", "1")
+            uvicorn.run(
+                "api_service:app",
+                host="0.0.0.0",
+                port=8004,
+                workers=workers,
+                loop="uvloop",
+                http="httptools",
+                log_level="warning",
+                access_log=False
+            )
     except KeyboardInterrupt:
         print("\n👋 服务已停止")
     except Exception as e:
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试增强版查找器的表格搜索结果
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from advanced_text_finder import fitz, _PageContext, _SearchSpec, _search_table_text
+
+# 4个相邻的单元格矩形组成表格区域 (100, 100) - (180, 140)
+TABLE_CELLS = [(100, 100, 140, 120), (140, 100, 180, 120), (100, 120, 140, 140), (140, 120, 180, 140)]
+
+def _create_table_pdf(pdf_path: str):
+    """创建包含2x2表格的PDF：单元格内、跨越表格边界、表格外各有一处目标文字"""
+    doc = fitz.open()
+    page = doc.new_page()
+
+    for cell in TABLE_CELLS:
+        page.draw_rect(fitz.Rect(cell), width=0.5)
+
+    page.insert_text((103, 115), "Alpha", fontsize=8)          # 完全位于表格内
+    page.insert_text((165, 135), "Alpha", fontsize=8)          # 跨越表格右边界
+    page.insert_text((110, 300), "Alpha outside", fontsize=8)  # 表格外
+
+    doc.save(pdf_path)
+    doc.close()
+
+def test_table_match_uses_clipped_search():
+    """table_match 结果应与 page.search_for(text, clip=表格区域) 完全一致"""
+    print("🧪 测试表格搜索结果")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "table_test.pdf")
+        _create_table_pdf(pdf_path)
+
+        passed = 0
+        test_cases = [
+            ("Alpha", False, "区分大小写"),
+            ("alpha", True, "忽略大小写"),
+        ]
+
+        for text, ignore_case, description in test_cases:
+            with fitz.open(pdf_path) as doc:
+                page = doc[0]
+                ctx = _PageContext(page)
+                # 直接提供表格检测所需的矩形绘图对象
+                ctx.drawings = [{"type": "re", "rect": fitz.Rect(cell)} for cell in TABLE_CELLS]
+                results = _search_table_text(ctx, _SearchSpec.create(text, ignore_case), 0)
+                table_results = [r for r in results if r["type"] == "table_match"]
+
+                # 期望值：与原实现一致，在表格区域内使用默认标志位搜索
+                expected = []
+                for table_area in {tuple(r["table_area"]) for r in table_results}:
+                    for rect in page.search_for(text, clip=fitz.Rect(table_area)):
+                        expected.append([rect.x0, rect.y0, rect.x1, rect.y1])
+
+            actual = [r["bbox"] for r in table_results]
+            success = bool(actual) and sorted(actual) == sorted(expected)
+
+            print(f"测试: {description} '{text}'")
+            print(f"  期望: {expected}")
+            print(f"  实际: {actual}")
+            print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+            print()
+
+            if success:
+                passed += 1
+
+    print(f"表格搜索测试结果: {passed}/{len(test_cases)} 通过")
+    return passed == len(test_cases)
+
+def main():
+    if fitz is None:
+        print("需要安装PyMuPDF来运行测试")
+        return False
+    return test_table_match_uses_clipped_search()
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
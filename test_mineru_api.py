@@ -6,6 +6,9 @@
 import requests
 import json
 
+# 所有测试共用一个会话，复用同一条keep-alive连接
+_session = requests.Session()
+
 
 def test_mineru_locate_api():
     """测试MinerU文本定位接口"""
@@ -28,7 +31,7 @@ def test_mineru_locate_api():
     
     try:
         # 发送POST请求
-        response = requests.post(endpoint, json=test_data, timeout=30)
+        response = _session.post(endpoint, json=test_data, timeout=30)
         
         print(f"📊 响应状态码: {response.status_code}")
         
@@ -72,7 +75,7 @@ def test_api_info():
     
     try:
         # 测试根端点
-        response = requests.get(base_url, timeout=10)
+        response = _session.get(base_url, timeout=10)
         if response.status_code == 200:
             result = response.json()
             print(f"✅ API服务运行正常")
@@ -95,7 +98,7 @@ def test_docs_info():
     print(f"\n📚 测试API文档信息")
     
     try:
-        response = requests.get(endpoint, timeout=10)
+        response = _session.get(endpoint, timeout=10)
         if response.status_code == 200:
             result = response.json()
             print(f"✅ 获取文档信息成功")
@@ -130,7 +133,7 @@ def test_page_number_feature():
     
     try:
         # 发送POST请求
-        response = requests.post(endpoint, json=test_data, timeout=30)
+        response = _session.post(endpoint, json=test_data, timeout=30)
         
         print(f"📊 响应状态码: {response.status_code}")
         
@@ -184,7 +187,7 @@ def test_page_limit_feature():
     
     try:
         # 发送POST请求
-        response = requests.post(endpoint, json=test_data, timeout=30)
+        response = _session.post(endpoint, json=test_data, timeout=30)
         
         print(f"📊 响应状态码: {response.status_code}")
         
@@ -243,5 +246,7 @@ if __name__ == "__main__":
     # 测试4页搜索限制功能
     test_page_limit_feature()
     
+    _session.close()
+    
     print(f"\n🏁 测试完成")
     print(f"💡 要查看交互式API文档，请访问: http://localhost:8004/docs")
\ No newline at end of file
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+测试RAG切片定位器的批量查询结果
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import rag_chunk_locator
+from rag_chunk_locator import (
+    fitz,
+    find_rag_chunk_coordinates,
+    find_rag_chunk_coordinates_from_bytes,
+    find_rag_chunks_batch,
+    build_exact_line_index,
+    exact_line_key,
+)
+
+PAGE_LINES = [
+    [
+        "Retrieval augmented generation combines search with text generation.",
+        "Each document is split into chunks before it is embedded.",
+        "The locator maps a chunk back to its position in the PDF.",
+        "Coordinates are reported as page numbers and bounding boxes.",
+    ],
+    [
+        "Tables and figures are detected from the drawings on each page.",
+        "Short chunks are matched with direct search and keywords.",
+        "Long chunks are matched against groups of nearby text blocks.",
+        "Similarity scores decide which region is the best match.",
+    ],
+]
+
+TEST_CHUNKS = [
+    "Each document is split into chunks before it is embedded.",                       # 完整的一行
+    "direct search and keywords",                                                      # 行内片段
+    " ".join(PAGE_LINES[1][1:]),                                                       # 跨多行的长文本
+    "This sentence does not appear anywhere in the test document at all.",            # 不存在的文本
+]
+
+def _create_test_pdf(pdf_path: str):
+    """创建两页测试PDF，每页若干行英文文本"""
+    doc = fitz.open()
+    for lines in PAGE_LINES:
+        page = doc.new_page()
+        for i, line in enumerate(lines):
+            page.insert_text((72, 100 + i * 20), line, fontsize=11)
+    doc.save(pdf_path)
+    doc.close()
+
+def test_batch_matches_single_queries():
+    """find_rag_chunks_batch 的结果应与逐个调用 find_rag_chunk_coordinates 完全一致"""
+    print("🧪 测试批量定位结果")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "rag_batch_test.pdf")
+        _create_test_pdf(pdf_path)
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+
+        passed = 0
+        test_cases = [
+            (pdf_path, "文件路径"),
+            (pdf_bytes, "二进制内容"),
+        ]
+
+        for pdf_source, description in test_cases:
+            expected = [find_rag_chunk_coordinates(chunk, pdf_source) for chunk in TEST_CHUNKS]
+            actual = find_rag_chunks_batch(TEST_CHUNKS, pdf_source)
+            success = any(expected) and actual == expected
+
+            print(f"测试: {description}")
+            print(f"  期望匹配数: {[len(r) for r in expected]}")
+            print(f"  实际匹配数: {[len(r) for r in actual]}")
+            print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+            print()
+
+            if success:
+                passed += 1
+
+    print(f"批量定位测试结果: {passed}/{len(test_cases)} 通过")
+    return passed == len(test_cases)
+
+def test_exact_line_index():
+    """精确匹配索引应按行文本返回 (页码, 行边界框, 行文本)，首尾空白不影响查找"""
+    print("🧪 测试精确匹配索引")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "rag_index_test.pdf")
+        _create_test_pdf(pdf_path)
+        index = build_exact_line_index(pdf_path)
+
+        # 期望值：直接从页面文本中取出对应行
+        line_text = PAGE_LINES[1][2]
+        expected = None
+        with fitz.open(pdf_path) as doc:
+            for block in doc[1].get_text("dict")["blocks"]:
+                for line in block.get("lines", []):
+                    if "".join(span["text"] for span in line["spans"]).strip() == line_text:
+                        expected = (2, list(line["bbox"]), line_text)
+
+    passed = 0
+    test_cases = [
+        (line_text, expected, "完整的一行"),
+        (f"  {line_text}\n", expected, "首尾带空白"),
+        ("Long chunks are matched", None, "行内片段不命中"),
+    ]
+
+    for text, expected_hit, description in test_cases:
+        actual = index.get(exact_line_key(text))
+        success = expected is not None and actual == expected_hit
+
+        print(f"测试: {description}")
+        print(f"  期望: {expected_hit}")
+        print(f"  实际: {actual}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        print()
+
+        if success:
+            passed += 1
+
+    print(f"精确匹配索引测试结果: {passed}/{len(test_cases)} 通过")
+    return passed == len(test_cases)
+
+def test_exact_index_fallback():
+    """阈值为1时未命中精确匹配索引的切片应退回 find_rag_chunk_coordinates"""
+    print("🧪 测试精确匹配索引未命中时的回退")
+    print("=" * 50)
+
+    try:
+        import api_service
+    except ImportError as e:
+        print(f"⏭️ 跳过: 无法导入api_service ({e})")
+        print()
+        return True
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "rag_fallback_test.pdf")
+        _create_test_pdf(pdf_path)
+
+        calls = []
+        def fake_find(**kwargs):
+            calls.append(kwargs)
+            return [{"type": "fallback"}]
+
+        original_find = api_service.find_rag_chunk_coordinates
+        api_service.find_rag_chunk_coordinates = fake_find
+        try:
+            hit = api_service._locate_with_exact_index(PAGE_LINES[0][0], pdf_path, 1.0)
+            miss = api_service._locate_with_exact_index("direct search and keywords", pdf_path, 1.0)
+        finally:
+            api_service.find_rag_chunk_coordinates = original_find
+
+    success = (hit[0]["type"] == "exact_line_match" and miss == [{"type": "fallback"}]
+               and len(calls) == 1 and calls[0]["similarity_threshold"] == 1.0)
+
+    print(f"  命中结果: {hit}")
+    print(f"  未命中结果: {miss}")
+    print(f"  回退调用次数: {len(calls)}")
+    print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+    print()
+    return success
+
+def test_from_bytes_matches_file_path():
+    """find_rag_chunk_coordinates_from_bytes 的结果应与按文件路径查询一致"""
+    print("🧪 测试从内存数据定位")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "rag_bytes_test.pdf")
+        _create_test_pdf(pdf_path)
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+
+        passed = 0
+        for chunk in TEST_CHUNKS:
+            expected = find_rag_chunk_coordinates(chunk, pdf_path)
+            actual = find_rag_chunk_coordinates_from_bytes(chunk, pdf_bytes)
+            success = actual == expected
+
+            print(f"测试: '{chunk[:30]}...'")
+            print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+
+            if success:
+                passed += 1
+
+    print()
+    print(f"内存数据定位测试结果: {passed}/{len(TEST_CHUNKS)} 通过")
+    return passed == len(TEST_CHUNKS)
+
+def test_uncached_document_skips_pool():
+    """cache_document=False 时结果不变，且文件不会进入文档池"""
+    print("🧪 测试不缓存文档的查询")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "rag_uncached_test.pdf")
+        _create_test_pdf(pdf_path)
+
+        chunk = TEST_CHUNKS[0]
+        pool_before = list(rag_chunk_locator._doc_pool.items())
+        actual = find_rag_chunk_coordinates(chunk, pdf_path, cache_document=False)
+        pool_after = list(rag_chunk_locator._doc_pool.items())
+
+        # 期望值：放入文档池的普通查询
+        expected = find_rag_chunk_coordinates(chunk, pdf_path)
+        cached = pdf_path in rag_chunk_locator._doc_pool
+
+    success = bool(expected) and actual == expected and pool_after == pool_before and cached
+
+    print(f"  结果一致: {actual == expected}")
+    print(f"  文档池未改变: {pool_after == pool_before}")
+    print(f"  默认查询放入文档池: {cached}")
+    print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+    print()
+    return success
+
+def main():
+    if fitz is None:
+        print("需要安装PyMuPDF来运行测试")
+        return False
+    results = [
+        test_batch_matches_single_queries(),
+        test_exact_line_index(),
+        test_exact_index_fallback(),
+        test_from_bytes_matches_file_path(),
+        test_uncached_document_skips_pool(),
+    ]
+    return all(results)
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
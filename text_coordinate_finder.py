@@ -4,6 +4,17 @@ PDF文字坐标查找器
 输入文字和PDF路径，返回文字在PDF中的坐标信息
 """
 
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+from rag_chunk_locator import open_pooled_pdf
+
+
 def find_text_coordinates(text: str, pdf_path: str):
     """
     在PDF中查找指定文字的坐标
@@ -21,36 +32,29 @@ def find_text_coordinates(text: str, pdf_path: str):
                   "rect": [x0, y0, x1, y1]   # 矩形坐标 (同bbox)
               }
     """
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        try:
-            import fitz
-        except ImportError:
-            raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    if fitz is None:
+        raise ImportError("请安装PyMuPDF: pip install pymupdf")
     
     results = []
     
-    # 打开PDF文档
-    doc = fitz.open(pdf_path)
-    
-    # 遍历每一页搜索文字
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        
-        # 搜索文字
-        text_instances = page.search_for(text)
-        
-        # 处理搜索结果
-        for rect in text_instances:
-            results.append({
-                "page": page_num + 1,  # 页码从1开始
-                "text": text,
-                "bbox": [rect.x0, rect.y0, rect.x1, rect.y1],
-                "rect": [rect.x0, rect.y0, rect.x1, rect.y1]
-            })
+    # 从文档池中打开PDF文档（不需要关闭）
+    with open_pooled_pdf(pdf_path) as doc:
+        # 遍历每一页搜索文字
+        for page_num in range(doc.page_count):
+            page = doc[page_num]
+            
+            # 搜索文字
+            text_instances = page.search_for(text)
+            
+            # 处理搜索结果
+            for rect in text_instances:
+                results.append({
+                    "page": page_num + 1,  # 页码从1开始
+                    "text": text,
+                    "bbox": [rect.x0, rect.y0, rect.x1, rect.y1],
+                    "rect": [rect.x0, rect.y0, rect.x1, rect.y1]
+                })
     
-    doc.close()
     return results
 
 
@@ -65,58 +69,52 @@ def find_text_coordinates_detailed(text: str, pdf_path: str):
     Returns:
         list: 包含详细坐标信息的列表
     """
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        try:
-            import fitz
-        except ImportError:
-            raise ImportError("请安装PyMuPDF: pip install pymupdf")
+    if fitz is None:
+        raise ImportError("请安装PyMuPDF: pip install pymupdf")
     
     results = []
-    doc = fitz.open(pdf_path)
-    
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        
-        # 搜索文字
-        text_instances = page.search_for(text)
-        
-        if text_instances:
-            # 获取页面的文字信息用于上下文
-            page_text = page.get_text("dict")
+    with open_pooled_pdf(pdf_path) as doc:
+        for page_num in range(doc.page_count):
+            page = doc[page_num]
             
-            for rect in text_instances:
-                # 获取周围的文字作为上下文
-                expanded_rect = fitz.Rect(
-                    max(0, rect.x0 - 50),
-                    max(0, rect.y0 - 20), 
-                    min(page.rect.width, rect.x1 + 50),
-                    min(page.rect.height, rect.y1 + 20)
-                )
-                
-                context_text = page.get_textbox(expanded_rect)
+            # 搜索文字
+            text_instances = page.search_for(text)
+            
+            if text_instances:
+                # 同一页的所有匹配项共用一份TextPage提取上下文，避免每次 get_textbox 重新解析整页
+                textpage = page.get_textpage(flags=0)
+                page_rect = page.rect
                 
-                results.append({
-                    "page": page_num + 1,
-                    "page_size": {
-                        "width": page.rect.width,
-                        "height": page.rect.height
-                    },
-                    "text": text,
-                    "bbox": [rect.x0, rect.y0, rect.x1, rect.y1],
-                    "context": context_text.strip(),
-                    "position_info": {
-                        "distance_from_left": rect.x0,
-                        "distance_from_top": rect.y0,
-                        "distance_from_right": page.rect.width - rect.x1,
-                        "distance_from_bottom": page.rect.height - rect.y1,
-                        "width": rect.width,
-                        "height": rect.height
-                    }
-                })
+                for rect in text_instances:
+                    # 获取周围的文字作为上下文
+                    expanded_rect = fitz.Rect(
+                        max(0, rect.x0 - 50),
+                        max(0, rect.y0 - 20), 
+                        min(page_rect.width, rect.x1 + 50),
+                        min(page_rect.height, rect.y1 + 20)
+                    )
+                    
+                    context_text = page.get_textbox(expanded_rect, textpage=textpage)
+                    
+                    results.append({
+                        "page": page_num + 1,
+                        "page_size": {
+                            "width": page_rect.width,
+                            "height": page_rect.height
+                        },
+                        "text": text,
+                        "bbox": [rect.x0, rect.y0, rect.x1, rect.y1],
+                        "context": context_text.strip(),
+                        "position_info": {
+                            "distance_from_left": rect.x0,
+                            "distance_from_top": rect.y0,
+                            "distance_from_right": page_rect.width - rect.x1,
+                            "distance_from_bottom": page_rect.height - rect.y1,
+                            "width": rect.width,
+                            "height": rect.height
+                        }
+                    })
     
-    doc.close()
     return results
 
 
@@ -125,14 +123,9 @@ def demo():
     """演示如何使用这些函数"""
     
     # 创建测试PDF
-    try:
-        import pymupdf as fitz
-    except ImportError:
-        try:
-            import fitz
-        except ImportError:
-            print("需要安装PyMuPDF来运行演示")
-            return
+    if fitz is None:
+        print("需要安装PyMuPDF来运行演示")
+        return
     
     # 创建示例PDF
     doc = fitz.open()